@@ -1,10 +1,9 @@
-from flask import Flask, g
-from config import DB_USERNAME, DB_PASSWORD, DB_NAME, DB_HOST, DB_PORT, SECRET_KEY, BOOTSTRAP_SERVE_LOCAL, SUPABASE_URL, SUPABASE_ANON_KEY
+from flask import Flask
+from config import SECRET_KEY, BOOTSTRAP_SERVE_LOCAL, SUPABASE_URL, SUPABASE_ANON_KEY
 from flask_wtf.csrf import CSRFProtect
-from psycopg2 import pool
 from flask_bootstrap import Bootstrap
 import app.db_init as create_database
-db_pool = None
+from app import db, instrumentation, slow_queries
 
 def create_app(test_config=None):
     app = Flask(__name__, instance_relative_config=True)
@@ -18,30 +17,11 @@ def create_app(test_config=None):
     
     #create_database.initialize_db()
     
-    #Initialize connection pool ONCE
-    global db_pool
-    if db_pool is None:
-        db_pool = pool.SimpleConnectionPool(
-            1, 10,  # min/max connections
-            user=DB_USERNAME,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME
-        )
-    # Open connection for this request
-    @app.before_request
-    def get_db_connection():
-        if "db_conn" not in g:
-            g.db_conn = db_pool.getconn()
-
-    # Close connection after request
-    @app.teardown_appcontext
-    def close_db_connection(exception):
-        conn = g.pop("db_conn", None)
-        if conn is not None:
-            db_pool.putconn(conn)
-            
+    #Initialize connection pool ONCE and bind one connection per request
+    db.init_app(app)
+    # Server-Timing header and a log line with each request's DB work
+    instrumentation.init_app(app)
+    slow_queries.init_app(app)
             
     from .user import user_bp as user_blueprint
     app.register_blueprint(user_blueprint)
@@ -53,5 +33,7 @@ def create_app(test_config=None):
     app.register_blueprint(programs_blueprint)
     from .students import students_bp as students_blueprint
     app.register_blueprint(students_blueprint)
+    from .admin import admin_bp as admin_blueprint
+    app.register_blueprint(admin_blueprint)
 
     return app
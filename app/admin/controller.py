@@ -0,0 +1,56 @@
+from . import admin_bp
+import hmac
+from flask import render_template, session, redirect, url_for, jsonify, flash, request, Response
+from app import slow_queries, metrics
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG, METRICS_TOKEN
+
+
+@admin_bp.route('/admin/slow-queries')
+def slow_queries_view():
+    """Summarize the slowest statements this worker has seen."""
+    if 'user_id' not in session:
+        return redirect(url_for('user.login'))
+
+    return render_template(
+        'slow_queries.html',
+        queries=slow_queries.worst_offenders(),
+        threshold_ms=SLOW_QUERY_MS,
+        log_path=SLOW_QUERY_LOG,
+        username=session.get('username'),
+        active_page="slow_queries"
+    )
+
+
+@admin_bp.route('/admin/slow-queries/reset', methods=['POST'])
+def reset_slow_queries():
+    if 'user_id' not in session:
+        return redirect(url_for('user.login'))
+
+    slow_queries.reset()
+    flash('Slow query summary cleared.', 'success')
+    return redirect(url_for('admin.slow_queries_view'))
+
+
+@admin_bp.route('/api/admin/slow-queries', methods=['GET'])
+def api_slow_queries():
+    """API endpoint listing the slowest statements, most total time first."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'threshold_ms': SLOW_QUERY_MS,
+            'queries': slow_queries.worst_offenders()
+        }
+    })
+
+
+@admin_bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target covering every worker."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {METRICS_TOKEN}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,36 @@
+import threading
+import time
+
+
+class TTLCache:
+    """A single cached value that expires after `ttl` seconds.
+
+    Per process: each worker holds its own copy, so `invalidate()` is
+    immediate here and other workers catch up within the TTL. Concurrent
+    misses share one load instead of all hitting the database.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires = 0.0
+        self._generation = 0
+
+    def get(self, loader):
+        if time.monotonic() < self._expires:
+            return self._value
+        with self._lock:
+            if time.monotonic() < self._expires:
+                return self._value
+            generation = self._generation
+            value = loader()
+            # an invalidate() during the load means the value may already be stale
+            if generation == self._generation:
+                self._value = value
+                self._expires = time.monotonic() + self.ttl
+            return value
+
+    def invalidate(self):
+        self._generation += 1
+        self._expires = 0.0
@@ -1,6 +1,8 @@
 from . import colleges_bp
-from flask import render_template, session, redirect, url_for, request, flash, jsonify
+from flask import render_template, session, redirect, url_for, request, flash, jsonify, make_response
 from .models import Colleges
+from app import reference
+from app.pagination import COUNT_MODES
 from .forms import CollegeForm, CollegeUpdateForm
 
 
@@ -11,7 +13,7 @@ def list():
 
     # Get search, sort, and pagination parameters
     search = request.args.get('q', '')
-    sort_by = request.args.get('sort', 'code')
+    sort_by = request.args.get('sort') or ('relevance' if search else 'code')
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
 
@@ -149,17 +151,53 @@ def api_list_colleges():
     try:
         # Get search, sort, and pagination parameters
         search = request.args.get('q', '')
-        sort_by = request.args.get('sort', 'code')
+        sort_by = request.args.get('sort') or ('relevance' if search else 'code')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
+        # opaque cursor from a previous response's next_cursor (keyset paging)
+        after = request.args.get('after', '')
+        # exact | estimate | none - how the total is computed
+        count = request.args.get('count', 'exact')
+        if count not in COUNT_MODES:
+            return jsonify({'success': False, 'error': f'count must be one of: {", ".join(COUNT_MODES)}'}), 400
 
         # Get paginated colleges data
-        colleges_data = Colleges.get_all(search=search, sort_by=sort_by, page=page, per_page=per_page)
+        colleges_data = Colleges.get_all(search=search, sort_by=sort_by, page=page, per_page=per_page, after=after if after else None, count=count)
 
         return jsonify({
             'success': True,
             'data': colleges_data
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@colleges_bp.route('/api/colleges/options', methods=['GET'])
+def api_college_options():
+    """Code/name pairs for select boxes.
+
+    Served from the reference cache with a strong ETag (a hash of the cached
+    data, the same in every worker) and revalidated on each use, so a page
+    view costs a 304 unless the colleges changed.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        snapshot = reference.snapshot()
+        etag = f'colleges-{snapshot.version}'
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = jsonify({
+                'success': True,
+                'data': [{'code': item['code'], 'name': item['name']} for item in snapshot.colleges]
+            })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
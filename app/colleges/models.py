@@ -1,5 +1,11 @@
 from flask import g
-from app import db_pool
+from app.db import connection
+from app import reference
+from app.dashboard.models import Dashboard
+from app.pagination import COUNT_MODES, encode_cursor, estimate_count, keyset_clause, total_pages
+
+# Must stay identical to the expression behind idx_colleges_search_trgm in db_init.
+SEARCH_DOCUMENT = "LOWER(college_code || ' ' || college_name)"
 
 class Colleges:
     
@@ -9,8 +15,7 @@ class Colleges:
 
     #new college
     def add(self):
-        conn = db_pool.getconn()
-        try:
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
@@ -21,73 +26,117 @@ class Colleges:
                     (self.college_code, self.college_name)
                 )
                 conn.commit()
-        finally:
-            db_pool.putconn(conn)
+                Dashboard.invalidate()
+                reference.invalidate()
         
     #read
     @staticmethod
-    def get_all(search=None, sort_by=None, page=1, per_page=10):
-        """Return paginated colleges with search and sort."""
-        conn = db_pool.getconn()
-        try:
+    def get_all(search=None, sort_by=None, page=1, per_page=10, after=None, count='exact'):
+        """Return paginated colleges with search and sort.
+
+        Pass the previous response's `next_cursor` as `after` to seek past it
+        instead of using OFFSET. `count` is 'exact', 'estimate' or 'none',
+        as in Students.get_all.
+        """
+        if count not in COUNT_MODES:
+            count = 'exact'
+
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
-                # First, get total count for pagination
-                count_query = "SELECT COUNT(*) FROM colleges"
-                count_params = []
+                from_sql = " FROM colleges"
+                where_sql = ""
+                filter_params = []
 
                 if search:
-                    count_query += " WHERE LOWER(college_code) LIKE LOWER(%s) OR LOWER(college_name) LIKE LOWER(%s)"
-                    search_term = f"%{search}%"
-                    count_params.extend([search_term, search_term])
+                    where_sql = f" WHERE {SEARCH_DOCUMENT} LIKE %s"
+                    filter_params.append(f"%{search.lower()}%")
 
-                cursor.execute(count_query, count_params)
-                total = cursor.fetchone()[0]
+                # college_code breaks ties so every row has a unique position
+                sort_mapping = {
+                    'code': 'college_code',
+                    'name': 'college_name'
+                }
+                # the term is a bound parameter of a lateral score, never part of
+                # the SQL text, so logs and statement stats don't see it
+                rank_sql, rank_params = "", []
+                if search:
+                    sort_mapping['relevance'] = 'score.relevance'
+
+                if sort_by not in sort_mapping:
+                    sort_by = 'code'
+                if sort_by == 'relevance':
+                    rank_sql = f" CROSS JOIN LATERAL (SELECT (-word_similarity(%s, {SEARCH_DOCUMENT}))::float8 AS relevance) score"
+                    rank_params = [search.lower()]
+                sort_column = sort_mapping[sort_by]
+                order_keys = [sort_column] if sort_by == 'code' else [sort_column, 'college_code']
 
-                # Now get paginated results
-                query = "SELECT college_code, college_name FROM colleges"
+                # Fold the total into the page query
                 params = []
+                total_sql = ""
+                if count == 'exact':
+                    if after:
+                        total_sql = f", (SELECT COUNT(*){from_sql}{where_sql})"
+                        params.extend(filter_params)
+                    else:
+                        total_sql = ", COUNT(*) OVER ()"
 
-                if search:
-                    query += " WHERE LOWER(college_code) LIKE LOWER(%s) OR LOWER(college_name) LIKE LOWER(%s)"
-                    params.extend([search_term, search_term])
+                query = f"SELECT college_code, college_name, {sort_column}{total_sql}{from_sql}{rank_sql}{where_sql}"
+                params.extend(rank_params)
+                params.extend(filter_params)
+
+                if after:
+                    seek_sql, seek_params = keyset_clause(order_keys, after, sort_by)
+                    query += (" AND " if where_sql else " WHERE ") + seek_sql
+                    params.extend(seek_params)
 
                 # Add sorting
-                if sort_by:
-                    sort_mapping = {
-                        'code': 'college_code',
-                        'name': 'college_name'
-                    }
-                    sort_column = sort_mapping.get(sort_by, 'college_code')
-                    query += f" ORDER BY {sort_column}"
-                else:
-                    query += " ORDER BY college_code"
+                query += " ORDER BY " + ", ".join(order_keys)
 
-                # Add pagination
-                offset = (page - 1) * per_page
-                query += " LIMIT %s OFFSET %s"
-                params.extend([per_page, offset])
+                # Add pagination, fetching one extra row to detect a next page
+                if after:
+                    query += " LIMIT %s"
+                    params.append(per_page + 1)
+                else:
+                    offset = (page - 1) * per_page
+                    query += " LIMIT %s OFFSET %s"
+                    params.extend([per_page + 1, offset])
 
                 cursor.execute(query, params)
                 rows = cursor.fetchall()
+                has_more = len(rows) > per_page
+                rows = rows[:per_page]
                 items = [{"code": r[0], "name": r[1]} for r in rows]
 
-                total_pages = (total + per_page - 1) // per_page  # Ceiling division
+                total = None
+                if count == 'exact':
+                    if rows:
+                        total = rows[0][3]
+                    elif page <= 1 and not after:
+                        total = 0
+                    else:
+                        cursor.execute(f"SELECT COUNT(*){from_sql}{where_sql}", filter_params)
+                        total = cursor.fetchone()[0]
+                elif count == 'estimate':
+                    total = estimate_count(cursor, from_sql, where_sql, filter_params)
+
+                next_cursor = None
+                if has_more:
+                    last = rows[-1]
+                    next_cursor = encode_cursor(sort_by, [last[2], last[0]] if sort_by != 'code' else [last[0]])
 
                 return {
                     'items': items,
                     'total': total,
-                    'pages': total_pages,
+                    'pages': total_pages(total, per_page),
                     'page': page,
-                    'per_page': per_page
+                    'per_page': per_page,
+                    'next_cursor': next_cursor
                 }
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def get_by_code(college_code):
         """Return a single college as a dict or None if not found."""
-        conn = db_pool.getconn()
-        try:
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     "SELECT college_code, college_name FROM colleges WHERE college_code = %s",
@@ -97,8 +146,6 @@ class Colleges:
                 if not row:
                     return None
                 return {"code": row[0], "name": row[1]}
-        finally:
-            db_pool.putconn(conn)
     
     #update
     def update():
@@ -107,8 +154,7 @@ class Colleges:
     @staticmethod
     def update_college(original_code, new_code, new_name):
         """Update a college's code and/or name. Returns number of affected rows."""
-        conn = db_pool.getconn()
-        try:
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
@@ -120,16 +166,15 @@ class Colleges:
                 )
                 updated = cursor.rowcount
                 conn.commit()
+                Dashboard.invalidate()
+                reference.invalidate()
                 return updated
-        finally:
-            db_pool.putconn(conn)
     
     #delete
     @staticmethod
     def delete(college_code):
         """Delete a college by its code"""
-        conn = db_pool.getconn()
-        try:
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
@@ -139,27 +184,19 @@ class Colleges:
                 )
                 deleted = cursor.rowcount
                 conn.commit()
+                Dashboard.invalidate()
+                reference.invalidate()
                 return deleted
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def get_all_list():
-        """Return all colleges as list of dicts."""
-        conn = db_pool.getconn()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT college_code, college_name FROM colleges ORDER BY college_code")
-                rows = cursor.fetchall()
-                return [{"code": r[0], "name": r[1]} for r in rows]
-        finally:
-            db_pool.putconn(conn)
+        """Return all colleges as list of dicts, from the shared reference cache (read-only)."""
+        return reference.colleges()
 
     @staticmethod
     def has_programs(college_code):
         """Return True if any programs reference this college_code."""
-        conn = db_pool.getconn()
-        try:
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     "SELECT COUNT(1) FROM programs WHERE college_code = %s",
@@ -167,8 +204,6 @@ class Colleges:
                 )
                 row = cursor.fetchone()
                 return bool(row and row[0])
-        finally:
-            db_pool.putconn(conn)
     
     
     
\ No newline at end of file
@@ -1,6 +1,8 @@
 from . import dashboard_bp
-from flask import render_template, session, redirect, url_for
+from flask import render_template, session, redirect, url_for, request, jsonify, make_response, Response
+from datetime import date
 from .models import Dashboard
+from . import live
 
 @dashboard_bp.route('/dashboard')
 @dashboard_bp.route('/')
@@ -8,11 +10,12 @@ def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('user.login'))
 
-    # Fetch data from database using Dashboard model
-    stats = Dashboard.get_stats()
-    program_counts_data = Dashboard.get_program_counts()
-    monthly_counts = Dashboard.get_monthly_trend()
-    recent_students = Dashboard.get_recent_students()
+    # Fetch data from database using Dashboard model (one cached round trip)
+    summary = Dashboard.get_summary()
+    stats = summary['stats']
+    program_counts_data = summary['program_counts']
+    monthly_counts = summary['monthly_counts']
+    recent_students = summary['recent_students']
     
     # Prepare chart data
     program_names = [p['program'] for p in program_counts_data]
@@ -34,6 +37,96 @@ def dashboard():
         months=months,
         monthly_counts=monthly_counts,
         recent_students=recent_students,
+        summary_version=summary['version'],
         username=session.get("username"),
         active_page="dashboard"
     )
+
+
+
+# API Endpoints
+@dashboard_bp.route('/api/dashboard', methods=['GET'])
+def api_dashboard():
+    """Stats, program counts, recent registrations and a registration trend.
+
+    The ETag is the summary version plus today's date (the default range and
+    "new this month" move with the calendar), so a poll with a current
+    If-None-Match costs one primary-key read and returns 304.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        granularity = request.args.get('granularity', 'month')
+        start = _parse_date(request.args.get('start'), 'start')
+        end = _parse_date(request.args.get('end'), 'end')
+        # a bad request is a 400 whatever the client has cached
+        start, end = Dashboard.trend_range(granularity, start, end)
+
+        etag = _etag(Dashboard.get_version())
+        if etag in request.if_none_match:
+            return _revalidate(make_response('', 304), etag)
+
+        summary = Dashboard.get_current_summary()
+        trend = Dashboard.get_trend(granularity, start, end)
+        data = {
+            'version': summary['version'],
+            'stats': summary['stats'],
+            'program_counts': summary['program_counts'],
+            'recent_students': [
+                dict(s, date_registered=s['date_registered'].isoformat() if s['date_registered'] else None)
+                for s in summary['recent_students']
+            ],
+            'trend': {
+                'granularity': trend['granularity'],
+                'start': trend['start'].isoformat(),
+                'end': trend['end'].isoformat(),
+                'points': [{'period': p['period'].isoformat(), 'count': p['count']} for p in trend['points']],
+            },
+        }
+        # tag with the version the summary was read at, not the one checked above
+        return _revalidate(jsonify({'success': True, 'data': data}), _etag(summary['version']))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@dashboard_bp.route('/api/dashboard/stream', methods=['GET'])
+def api_dashboard_stream():
+    """Server-Sent Events with each dashboard change as it commits.
+
+    Fed by this worker's single LISTEN connection (see live.py); the stream
+    itself never touches the database.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    subscription = live.feed.subscribe()
+    if subscription is None:
+        return jsonify({'success': False, 'error': 'Too many live dashboards open; poll /api/dashboard instead'}), 503
+
+    response = Response(live.stream(subscription), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: pass each event straight through
+    return response
+
+
+def _etag(version):
+    return f'{version}-{date.today().isoformat()}'
+
+
+def _revalidate(response, etag):
+    response.set_etag(etag)
+    # per-user data: browsers may keep it but must check back every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
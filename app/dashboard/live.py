@@ -0,0 +1,177 @@
+"""Live dashboard updates: one LISTEN connection per worker, fanned out over SSE.
+
+The summary triggers (migration 7) NOTIFY dashboard_changes once per
+committed transaction that wrote students, programs or colleges, with the new
+summary version and what changed. A daemon thread holds this worker's only LISTEN connection, turns
+each notification into a dashboard delta and puts it on every subscriber's
+queue; each SSE response drains its own queue, so open dashboards cost no
+queries. The thread starts with the first subscriber and exits after the last.
+
+Every event carries the summary version. Versions arrive gap-free, so a
+browser that sees a jump, or an event marked `resync`, reloads /api/dashboard.
+
+Each open stream occupies a worker thread: run gunicorn with threaded
+(`--worker-class gthread`) or async workers when dashboards are left open.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from datetime import date
+import psycopg2
+from config import (DB_USERNAME, DB_PASSWORD, DB_NAME, DB_HOST, DB_PORT,
+                    DASHBOARD_STREAM_MAX_CLIENTS, DASHBOARD_STREAM_KEEPALIVE_SECONDS)
+from .models import RECENT_LIMIT
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'dashboard_changes'
+QUEUE_SIZE = 100  # events a slow client may fall behind before it is told to resync
+POLL_SECONDS = 5  # how often the listener checks whether anyone is still subscribed
+RECONNECT_SECONDS = 5
+RETRY_MS = 5000  # EventSource reconnect delay
+
+
+class DashboardFeed:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+
+    def subscribe(self):
+        """A new subscriber queue, or None when this worker has no room for another stream."""
+        with self._lock:
+            if len(self._subscribers) >= DASHBOARD_STREAM_MAX_CLIENTS:
+                return None
+            subscription = queue.Queue(maxsize=QUEUE_SIZE)
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='dashboard-listener', daemon=True)
+                self._thread.start()
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # a client this far behind catches up from /api/dashboard instead
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait({'version': event.get('version'), 'resync': True})
+
+    def _keep_running(self):
+        # decides under the lock, so a new subscriber either sees this thread or starts another
+        with self._lock:
+            if self._subscribers:
+                return True
+            self._thread = None
+            return False
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+                return
+            except Exception:
+                # a lost connection or a bug: either way, log it and start over
+                # rather than leave subscribers on keepalives with no updates
+                logger.exception("Dashboard listener failed; reconnecting")
+                # notifications sent while it was down are gone for good
+                self.publish({'version': None, 'resync': True})
+                if not self._keep_running():
+                    return
+                time.sleep(RECONNECT_SECONDS)
+
+    def _listen(self):
+        # a dedicated connection: it is held for as long as anyone is watching,
+        # so it must not take a slot from the request pool
+        conn = psycopg2.connect(user=DB_USERNAME, password=DB_PASSWORD, host=DB_HOST,
+                                port=DB_PORT, database=DB_NAME)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while self._keep_running():
+                if select.select([conn], [], [], POLL_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        event = to_event(json.loads(notify.payload))
+                    except Exception:
+                        # one bad payload costs subscribers a reload, not the listener
+                        logger.exception("Unreadable dashboard notification: %r", notify.payload)
+                        event = {'version': None, 'resync': True}
+                    self.publish(event)
+        finally:
+            conn.close()
+
+
+feed = DashboardFeed()
+
+
+def to_event(payload, today=None):
+    """Translate a trigger payload into the deltas the dashboard page applies.
+
+    Counts are keyed the way the page shows them: program name for the
+    program chart and month number (this year only) for the trend.
+    """
+    event = {'version': payload['version']}
+    if payload.get('resync'):
+        event['resync'] = True
+        return event
+
+    table = payload['table']
+    if table == 'students':
+        today = today or date.today()
+        stats = {'total_students': 0, 'new_registrations': 0}
+        programs, months = {}, {}
+        for day, program, n in payload['deltas']:
+            stats['total_students'] += n
+            if program:
+                programs[program] = programs.get(program, 0) + n
+            if day:
+                day = date.fromisoformat(day)
+                if day.year == today.year:
+                    months[day.month] = months.get(day.month, 0) + n
+                    if day.month == today.month:
+                        stats['new_registrations'] += n
+        event.update(stats=stats, programs=programs, months=months, recent=[
+            {
+                'name': f"{first_name} {last_name}",
+                'program': program or college or '',
+                'college': college or '',
+                'date_registered': registered,
+            }
+            for first_name, last_name, program, college, registered in payload['recent'][:RECENT_LIMIT]
+        ])
+    elif table == 'colleges':
+        event['stats'] = {'total_colleges': payload['delta']}
+    else:
+        event['resync'] = True
+    return event
+
+
+def stream(subscription):
+    """SSE body for one subscriber; unsubscribes when the client goes away."""
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                event = subscription.get(timeout=DASHBOARD_STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {json.dumps(event)}\n\n"
+    finally:
+        feed.unsubscribe(subscription)
@@ -1,119 +1,186 @@
-from app import db_pool
-from datetime import datetime
+from app.db import connection
+from app.cache import TTLCache
+from datetime import date, datetime
+from config import DASHBOARD_CACHE_SECONDS
+
+summary_cache = TTLCache(DASHBOARD_CACHE_SECONDS)
+
+SUMMARY_QUERY = """
+    WITH program_counts AS (
+        -- per-program totals are kept by the summary triggers
+        SELECT p.program_name, COALESCE(pc.student_count, 0) AS n
+        FROM programs p
+        LEFT JOIN program_student_counts pc ON pc.program_code = p.program_code
+    ),
+    monthly AS (
+        SELECT EXTRACT(MONTH FROM day)::int AS month, SUM(registrations)::bigint AS n
+        FROM registrations_daily
+        WHERE day >= %(year_start)s AND day < %(year_end)s
+        GROUP BY 1
+    ),
+    recent AS (
+        SELECT s.first_name, s.last_name, p.program_name, c.college_name, s.date_registered
+        FROM students s
+        LEFT JOIN programs p ON s.program_code = p.program_code
+        LEFT JOIN colleges c ON p.college_code = c.college_code
+        WHERE s.date_registered IS NOT NULL
+        ORDER BY s.date_registered DESC
+        LIMIT %(recent_limit)s
+    )
+    SELECT
+        COALESCE((SELECT row_count FROM table_counts WHERE table_name = 'students'), 0),
+        COALESCE((SELECT row_count FROM table_counts WHERE table_name = 'programs'), 0),
+        COALESCE((SELECT row_count FROM table_counts WHERE table_name = 'colleges'), 0),
+        (SELECT COALESCE(SUM(registrations), 0)::bigint FROM registrations_daily
+         WHERE day >= %(month_start)s AND day < %(month_end)s),
+        (SELECT COALESCE(json_agg(json_build_array(program_name, n) ORDER BY program_name), '[]') FROM program_counts),
+        (SELECT COALESCE(json_agg(json_build_array(month, n) ORDER BY month), '[]') FROM monthly),
+        (SELECT COALESCE(json_agg(json_build_array(first_name, last_name, program_name, college_name, date_registered)
+                                  ORDER BY date_registered DESC), '[]')
+         FROM recent),
+        (SELECT version FROM summary_version)
+"""
+
+# zero-filled buckets from the daily rollup; %(unit)s is one of GRANULARITIES
+TREND_QUERY = """
+    SELECT period::date, COALESCE(SUM(r.registrations), 0)::bigint
+    FROM generate_series(date_trunc(%(unit)s, %(start)s::timestamp), %(end)s::timestamp, ('1 ' || %(unit)s)::interval) AS period
+    LEFT JOIN registrations_daily r
+        ON r.day >= period AND r.day < period + ('1 ' || %(unit)s)::interval
+        AND r.day >= %(start)s AND r.day <= %(end)s
+    GROUP BY period
+    ORDER BY period
+"""
+
+# rows in the dashboard's recent registrations table
+RECENT_LIMIT = 4
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+# roughly ten years of days; keeps one request from building a huge series
+MAX_TREND_POINTS = 3660
+
+
+def _month_bounds(now):
+    month_start = date(now.year, now.month, 1)
+    month_end = date(now.year + 1, 1, 1) if now.month == 12 else date(now.year, now.month + 1, 1)
+    return month_start, month_end
 
 
 class Dashboard:
     @staticmethod
-    def get_stats():
-        """Get dashboard statistics: total students, programs, colleges, new registrations."""
-        conn = db_pool.getconn()
-        try:
-            with conn.cursor() as cursor:
-                # Total students
-                cursor.execute("SELECT COUNT(*) FROM students")
-                total_students = cursor.fetchone()[0]
-
-                # Total programs
-                cursor.execute("SELECT COUNT(*) FROM programs")
-                total_programs = cursor.fetchone()[0]
-
-                # Total colleges
-                cursor.execute("SELECT COUNT(*) FROM colleges")
-                total_colleges = cursor.fetchone()[0]
-
-                # New registrations this month
-                now = datetime.now()
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM students
-                    WHERE EXTRACT(YEAR FROM date_registered) = %s
-                    AND EXTRACT(MONTH FROM date_registered) = %s
-                    """,
-                    (now.year, now.month)
-                )
-                new_registrations = cursor.fetchone()[0]
-
-                return {
-                    'total_students': total_students,
-                    'total_programs': total_programs,
-                    'total_colleges': total_colleges,
-                    'new_registrations': new_registrations
-                }
-        finally:
-            db_pool.putconn(conn)
+    def get_summary(recent_limit=RECENT_LIMIT):
+        """Stats, program counts, this year's monthly trend and recent students.
+
+        One round trip over the trigger-maintained summary tables (migration 4),
+        so the counts cost a few primary-key reads however many students there
+        are; only the recent list reads students, through its date index.
+        Cached for DASHBOARD_CACHE_SECONDS; student, program and college writes
+        call `invalidate()`.
+        """
+        return summary_cache.get(lambda: Dashboard._load_summary(recent_limit))
+
+    @staticmethod
+    def invalidate():
+        summary_cache.invalidate()
 
     @staticmethod
-    def get_program_counts():
-        """Get count of students per program."""
-        conn = db_pool.getconn()
-        try:
+    def get_version():
+        """The summary_version counter, bumped once by each transaction that writes students, programs or colleges."""
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT p.program_name, COUNT(s.id_number) as count
-                    FROM programs p
-                    LEFT JOIN students s ON p.program_code = s.program_code
-                    GROUP BY p.program_code, p.program_name
-                    ORDER BY p.program_name
-                    """
-                )
-                rows = cursor.fetchall()
-                return [{"program": r[0], "count": r[1]} for r in rows]
-        finally:
-            db_pool.putconn(conn)
+                cursor.execute("SELECT version FROM summary_version")
+                row = cursor.fetchone()
+                return row[0] if row else 0
+
+    @staticmethod
+    def get_current_summary(recent_limit=RECENT_LIMIT):
+        """get_summary(), reloaded if another worker has written since it was cached."""
+        version = Dashboard.get_version()
+        summary = Dashboard.get_summary(recent_limit)
+        if summary['version'] != version:
+            Dashboard.invalidate()
+            summary = Dashboard.get_summary(recent_limit)
+        return summary
 
     @staticmethod
-    def get_monthly_trend():
-        """Get monthly student registration trend for the current year."""
-        conn = db_pool.getconn()
-        try:
+    def get_trend(granularity='month', start=None, end=None):
+        """Registrations per day, week, month or year between two dates (inclusive).
+
+        Buckets come from date_trunc over registrations_daily, so the cost
+        follows the number of days in range rather than the number of
+        students. Weeks start on Monday; empty buckets are reported as 0.
+        """
+        start, end = Dashboard.trend_range(granularity, start, end)
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT EXTRACT(MONTH FROM date_registered) as month,
-                           COUNT(*) as count
-                    FROM students
-                    WHERE EXTRACT(YEAR FROM date_registered) = %s
-                    GROUP BY EXTRACT(MONTH FROM date_registered)
-                    ORDER BY month
-                    """,
-                    (datetime.now().year,)
-                )
+                cursor.execute(TREND_QUERY, {'unit': granularity, 'start': start, 'end': end})
                 rows = cursor.fetchall()
-                # Fill in missing months with 0
-                monthly_data = {i: 0 for i in range(1, 13)}
-                for r in rows:
-                    monthly_data[int(r[0])] = r[1]
-                return list(monthly_data.values())
-        finally:
-            db_pool.putconn(conn)
+        return {
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'points': [{'period': period, 'count': n} for period, n in rows],
+        }
 
     @staticmethod
-    def get_recent_students(limit=4):
-        """Get recently registered students."""
-        conn = db_pool.getconn()
-        try:
+    def trend_range(granularity='month', start=None, end=None):
+        """Validate trend arguments and fill in the default range.
+
+        Returns (start, end): this year to date when neither is given.
+        Raises ValueError for an unknown granularity, an inverted range or
+        one with more than MAX_TREND_POINTS buckets.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+        end = end or date.today()
+        start = start or date(end.year, 1, 1)
+        if start > end:
+            raise ValueError('start must not be after end')
+        days = (end - start).days + 1
+        points = {'day': days, 'week': days / 7, 'month': days / 28, 'year': days / 365}[granularity]
+        if points > MAX_TREND_POINTS:
+            raise ValueError(f'Range too large for {granularity} granularity (max {MAX_TREND_POINTS} points)')
+        return start, end
+
+    @staticmethod
+    def _load_summary(recent_limit):
+        now = datetime.now()
+        month_start, month_end = _month_bounds(now)
+        params = {
+            'month_start': month_start,
+            'month_end': month_end,
+            'year_start': date(now.year, 1, 1),
+            'year_end': date(now.year + 1, 1, 1),
+            'recent_limit': recent_limit,
+        }
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT s.first_name, s.last_name, p.program_name, c.college_name, s.date_registered
-                    FROM students s
-                    LEFT JOIN programs p ON s.program_code = p.program_code
-                    LEFT JOIN colleges c ON p.college_code = c.college_code
-                    ORDER BY s.date_registered DESC
-                    LIMIT %s
-                    """,
-                    (limit,)
-                )
-                rows = cursor.fetchall()
-                return [
-                    {
-                        "name": f"{r[0]} {r[1]}",
-                        "program": r[2] or r[3],  # fallback to program_code if name is null
-                        "college": r[3] or "",
-                        "date_registered": r[4]
-                    }
-                    for r in rows
-                ]
-        finally:
-            db_pool.putconn(conn)
+                cursor.execute(SUMMARY_QUERY, params)
+                (total_students, total_programs, total_colleges, new_registrations,
+                 programs, monthly, recent, version) = cursor.fetchone()
+
+        # Fill in missing months with 0
+        monthly_data = {i: 0 for i in range(1, 13)}
+        for month, n in monthly:
+            monthly_data[month] = n
+
+        return {
+            'version': version,
+            'stats': {
+                'total_students': total_students,
+                'total_programs': total_programs,
+                'total_colleges': total_colleges,
+                'new_registrations': new_registrations
+            },
+            'program_counts': [{"program": name, "count": n} for name, n in programs],
+            'monthly_counts': list(monthly_data.values()),
+            'recent_students': [
+                {
+                    "name": f"{r[0]} {r[1]}",
+                    "program": r[2] or r[3],  # fallback to program_code if name is null
+                    "college": r[3] or "",
+                    "date_registered": datetime.fromisoformat(r[4]) if r[4] else None
+                }
+                for r in recent
+            ]
+        }
@@ -0,0 +1,262 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context
+from psycopg2 import pool, extensions
+from app import slow_queries
+from config import DB_USERNAME, DB_PASSWORD, DB_NAME, DB_HOST, DB_PORT, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+db_pool = None
+
+
+class PoolTimeout(pool.PoolError):
+    """Raised when no connection frees up within the pool timeout."""
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """Thread-safe pool that waits for a free connection instead of failing.
+
+    psycopg2's pools raise PoolError the moment every connection is checked
+    out. Here a semaphore with one slot per connection makes callers queue for
+    up to `timeout` seconds, and checkout waits, in-use count and timeouts are
+    tracked so the pool can be sized against real traffic.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=5, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._stats_lock = threading.Lock()
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+
+    def getconn(self, key=None):
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._stats_lock:
+                    self._timeouts += 1
+                logger.warning("No database connection free after %.1fs: %s", self.timeout, self.stats())
+                raise PoolTimeout(f"no database connection available within {self.timeout}s")
+        waited = time.perf_counter() - start
+        try:
+            conn = super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._stats_lock:
+            self._in_use += 1
+            self._checkouts += 1
+            if waited > 0.001:
+                self._waits += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            if not close:
+                try:
+                    reset_connection(conn)
+                except Exception:
+                    # a connection that broke mid-request (server restart, network
+                    # drop) cannot be reset; discard it rather than leak its slot
+                    logger.warning("Discarding a database connection that failed to reset", exc_info=True)
+                    close = True
+            super().putconn(conn, key, close)
+        finally:
+            with self._stats_lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        """Return a snapshot of pool usage counters."""
+        with self._stats_lock:
+            return {
+                'max': self.maxconn,
+                'in_use': self._in_use,
+                'idle': len(self._pool),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_seconds_total': round(self._wait_total, 6),
+                'wait_seconds_max': round(self._wait_max, 6),
+                'timeouts': self._timeouts,
+            }
+
+
+class InstrumentedCursor(extensions.cursor):
+    """Cursor that records each statement's count and duration on the request.
+
+    Every pooled connection hands these out, so `request_stats()` covers the
+    round trips a request made regardless of which model issued them.
+    Statements slower than SLOW_QUERY_MS go to the slow-query log.
+    """
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            _record_query(time.perf_counter() - start)
+            raise
+        self._finished(query, vars, time.perf_counter() - start)
+        return result
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            result = super().executemany(query, vars_list)
+        except Exception:
+            _record_query(time.perf_counter() - start)
+            raise
+        self._finished(query, None, time.perf_counter() - start)
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            result = super().copy_expert(sql, file, size)
+        except Exception:
+            _record_query(time.perf_counter() - start)
+            raise
+        self._finished(sql, None, time.perf_counter() - start)
+        return result
+
+    def _finished(self, query, vars, seconds):
+        _record_query(seconds)
+        # named cursors only DECLARE here; their rows are fetched later
+        if self.name is None and slow_queries.is_slow(seconds):
+            slow_queries.record(self, query, vars, seconds)
+
+
+def _record_query(seconds):
+    if has_app_context():
+        g.db_queries = g.get("db_queries", 0) + 1
+        g.db_seconds = g.get("db_seconds", 0.0) + seconds
+
+
+def query_count():
+    """Number of statements the current request has sent so far."""
+    return g.get("db_queries", 0) if has_app_context() else 0
+
+
+def request_stats():
+    """Statement count, time in statements and time waiting on the pool for this request."""
+    if not has_app_context():
+        return {'queries': 0, 'db_seconds': 0.0, 'pool_wait_seconds': 0.0}
+    return {
+        'queries': g.get("db_queries", 0),
+        'db_seconds': g.get("db_seconds", 0.0),
+        'pool_wait_seconds': g.get("db_pool_wait", 0.0),
+    }
+
+
+def reset_connection(conn):
+    """Return a connection to a clean, non-autocommit idle state.
+
+    Run before a connection goes back to the pool so no session is left
+    "idle in transaction" holding a snapshot, and a read block's autocommit
+    flag never leaks into the next borrower's writes.
+    """
+    if conn is None or conn.closed:
+        return
+    status = conn.info.transaction_status
+    if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+        conn.rollback()
+    if conn.autocommit:
+        conn.autocommit = False
+
+
+def init_app(app):
+    """Create the connection pool once and return each request's connection on teardown.
+
+    Nothing is checked out up front: `connection()` takes a connection on the
+    first query of a request, so static files, auth pages and other routes
+    that never touch the database do not hold one.
+    """
+    global db_pool
+    if db_pool is None:
+        db_pool = BlockingConnectionPool(
+            DB_POOL_MIN, DB_POOL_MAX,
+            timeout=DB_POOL_TIMEOUT,
+            user=DB_USERNAME,
+            password=DB_PASSWORD,
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            cursor_factory=InstrumentedCursor
+        )
+
+    # Close connection after request, if one was ever checked out
+    @app.teardown_appcontext
+    def close_db_connection(exception):
+        conn = g.pop("db_conn", None)
+        if conn is not None:
+            db_pool.putconn(conn)
+
+
+@contextmanager
+def connection(readonly=False):
+    """Yield the connection bound to the current request.
+
+    Every model method runs through here so a request costs at most one pooled
+    connection, checked out lazily on first use. Outside an app context (CLI
+    scripts, background jobs) a connection is checked out for the duration of
+    the block instead.
+
+    SELECT-only methods pass `readonly=True`: the block runs in autocommit, so
+    no implicit BEGIN is sent and the session never sits idle in a transaction
+    after the rows are fetched.
+    """
+    if has_app_context():
+        if "db_conn" not in g:
+            start = time.perf_counter()
+            g.db_conn = db_pool.getconn()
+            g.db_pool_wait = time.perf_counter() - start
+        conn = g.db_conn
+        try:
+            with _read_mode(conn, readonly):
+                yield conn
+        except Exception:
+            # leave the shared connection usable for the rest of the request
+            _rollback_quietly(conn)
+            raise
+        return
+
+    conn = db_pool.getconn()
+    try:
+        with _read_mode(conn, readonly):
+            yield conn
+    except Exception:
+        _rollback_quietly(conn)
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+
+def _rollback_quietly(conn):
+    # on a dead connection the rollback fails too; the original error is the one to report
+    try:
+        conn.rollback()
+    except Exception:
+        logger.warning("Rollback failed after a database error", exc_info=True)
+
+
+@contextmanager
+def _read_mode(conn, readonly):
+    # Only switch when idle; a read inside an open write transaction must see its changes.
+    if not readonly or conn.autocommit or conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+        yield
+        return
+    conn.autocommit = True
+    try:
+        yield
+    finally:
+        conn.autocommit = False
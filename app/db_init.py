@@ -1,3 +1,5 @@
+import re
+import sys
 import psycopg2
 from psycopg2 import sql, extras
 from config import DB_NAME, DB_USERNAME, DB_PASSWORD, DB_HOST, DB_PORT
@@ -45,44 +47,32 @@ def get_connection():
     )
 
 
-def execute_query(query, params=None):
-    """Helper to execute a single query"""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(query, params)
-        conn.commit()
-    except Exception as e:
-        print(f"Error: {e}")
-    finally:
-        cur.close()
-        conn.close()
+def seed_if_empty(cur, table, insert_query, rows):
+    """Insert seed rows only into an empty table, so restarts skip seeding."""
+    cur.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {})").format(sql.Identifier(table)))
+    if cur.fetchone()[0]:
+        return False
+    extras.execute_values(cur, insert_query, rows)
+    return True
 
 
-def ready_college_table():
+def ready_college_table(cur):
     query = """
     CREATE TABLE IF NOT EXISTS colleges (
         college_code VARCHAR(20) PRIMARY KEY,
         college_name VARCHAR(100) NOT NULL
     )
     """
-    execute_query(query)
+    cur.execute(query)
 
     insert_query = """
     INSERT INTO colleges (college_code, college_name) VALUES %s
     ON CONFLICT (college_code) DO NOTHING
     """
     colleges = [('ENG', 'College of Engineering'), ('SCI', 'College of Science'), ('ART', 'College of Arts')]
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        extras.execute_values(cur, insert_query, colleges)
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    seed_if_empty(cur, 'colleges', insert_query, colleges)
 
-def ready_program_table():
+def ready_program_table(cur):
     query = """
     CREATE TABLE IF NOT EXISTS programs (
         program_code VARCHAR(20) PRIMARY KEY,
@@ -95,7 +85,7 @@ def ready_program_table():
             ON DELETE SET NULL
     )
     """
-    execute_query(query)
+    cur.execute(query)
 
     insert_query = """
     INSERT INTO programs (program_code, program_name, college_code) VALUES %s
@@ -112,16 +102,9 @@ def ready_program_table():
         ('BAHIST', 'Bachelor of Arts in History', 'ART'),
         ('BAART', 'Bachelor of Arts in Fine Arts', 'ART')
     ]
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        extras.execute_values(cur, insert_query, programs)
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    seed_if_empty(cur, 'programs', insert_query, programs)
  
-def ready_student_table():
+def ready_student_table(cur):
     query = """
     CREATE TABLE IF NOT EXISTS students (
         id_number VARCHAR(15) PRIMARY KEY,
@@ -139,18 +122,18 @@ def ready_student_table():
             ON DELETE SET NULL
     )
     """
-    execute_query(query)
+    cur.execute(query)
 
     # Add columns if not exists
     alter_query = """
     ALTER TABLE students ADD COLUMN IF NOT EXISTS date_registered TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     """
-    execute_query(alter_query)
+    cur.execute(alter_query)
 
     alter_query_file_link = """
     ALTER TABLE students ADD COLUMN IF NOT EXISTS file_link VARCHAR(255)
     """
-    execute_query(alter_query_file_link)
+    cur.execute(alter_query_file_link)
 
     insert_query = """
     INSERT INTO students (id_number, first_name, last_name, year_level, gender, program_code) VALUES %s
@@ -171,23 +154,16 @@ def ready_student_table():
         gender = genders[(i-1) % len(genders)]
         program = programs[(i-1) % len(programs)]
         students.append((id_num, first_name, last_name, year_level, gender, program))
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        extras.execute_values(cur, insert_query, students)
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    seed_if_empty(cur, 'students', insert_query, students)
 
 
-def ready_year_level_table():
+def ready_year_level_table(cur):
     query = """
     CREATE TABLE IF NOT EXISTS year_levels (
         year_level VARCHAR(20) PRIMARY KEY
     )
     """
-    execute_query(query)
+    cur.execute(query)
 
     insert_query = """
     INSERT INTO year_levels (year_level) VALUES %s
@@ -195,39 +171,25 @@ def ready_year_level_table():
     """
     year_levels = [('1st Year',), ('2nd Year',), ('3rd Year',),
                    ('4th Year',), ('5th Year',)]
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        extras.execute_values(cur, insert_query, year_levels)
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    seed_if_empty(cur, 'year_levels', insert_query, year_levels)
 
 
-def ready_years_table():
+def ready_years_table(cur):
     query = """
     CREATE TABLE IF NOT EXISTS years (
         year VARCHAR(20) PRIMARY KEY
     )
     """
-    execute_query(query)
+    cur.execute(query)
 
     insert_query = """
     INSERT INTO years (year) VALUES %s
     ON CONFLICT (year) DO NOTHING
     """
     years = [('2024',), ('2025',)]
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        extras.execute_values(cur, insert_query, years)
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    seed_if_empty(cur, 'years', insert_query, years)
 
-def ready_users_table():
+def ready_users_table(cur):
     """Create users table with a starting sequence."""
     query = """
     CREATE TABLE IF NOT EXISTS users (
@@ -238,7 +200,7 @@ def ready_users_table():
         profile_picture VARCHAR(255)
     );
     """
-    execute_query(query)
+    cur.execute(query)
 
     insert_query = """
     INSERT INTO users (username, email, user_password) VALUES %s
@@ -251,16 +213,9 @@ def ready_users_table():
         ('alicejohnson', 'alice.johnson@example.com', 'pass789'),
         ('bobwilliams', 'bob.williams@example.com', 'pass000')
     ]
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        extras.execute_values(cur, insert_query, users)
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    seed_if_empty(cur, 'users', insert_query, users)
 
-def ready_user_info_table():
+def ready_user_info_table(cur):
     """Create user_info table with a starting sequence."""
     query = """
     CREATE TABLE IF NOT EXISTS user_info (
@@ -271,7 +226,7 @@ def ready_user_info_table():
         user_id INT REFERENCES users(id) ON DELETE CASCADE
     );
     """
-    execute_query(query)
+    cur.execute(query)
 
     insert_query = """
     INSERT INTO user_info (fullname, address, birthday, user_id) VALUES %s
@@ -284,27 +239,722 @@ def ready_user_info_table():
         ('Alice Johnson', '101 User Rd, City, Country', '1988-12-10', 4),
         ('Bob Williams', '202 User Ln, City, Country', '1993-03-25', 5)
     ]
-    conn = get_connection()
+    seed_if_empty(cur, 'user_info', insert_query, user_infos)
+
+
+# Versioned schema changes, applied in order and recorded in schema_version.
+# Index migrations are built with CREATE INDEX CONCURRENTLY, which cannot run
+# inside a transaction, so they are marked concurrent and run in autocommit;
+# they never block writes and can be applied to a live registry.
+MIGRATIONS = [
+    (1, "pg_trgm extension for the list searches", False, [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    ]),
+    (2, "foreign key and date indexes", True, [
+        # joins, program filters and the ON UPDATE/DELETE cascades from programs
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_program_code ON students (program_code)",
+        # dashboard trend and recent-students queries
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_date_registered ON students (date_registered)",
+        # joins and the cascades from colleges
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_programs_college_code ON programs (college_code)",
+        # id_number LIKE 'YEAR-%' prefix scans in next-ID allocation
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_id_pattern ON students (id_number text_pattern_ops)",
+    ]),
+    # The indexed expressions must stay identical to SEARCH_DOCUMENT in the
+    # students, programs and colleges models, otherwise the planner falls back
+    # to sequential scans.
+    (3, "trigram search indexes", True, [
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_search_trgm ON students USING gin (
+            (LOWER(id_number || ' ' || first_name || ' ' || last_name || ' ' ||
+             COALESCE(program_code, '') || ' ' || COALESCE(year_level, '') || ' ' || COALESCE(gender, '')))
+            gin_trgm_ops
+        )
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_programs_search_trgm ON programs USING gin (
+            (LOWER(program_code || ' ' || program_name)) gin_trgm_ops
+        )
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_programs_name_trgm ON programs USING gin (
+            LOWER(program_name) gin_trgm_ops
+        )
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_colleges_search_trgm ON colleges USING gin (
+            (LOWER(college_code || ' ' || college_name)) gin_trgm_ops
+        )
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_colleges_name_trgm ON colleges USING gin (
+            LOWER(college_name) gin_trgm_ops
+        )
+        """,
+    ]),
+    # Dashboard summaries kept exact by statement-level triggers, so the
+    # dashboard reads a few small rows however large the registry grows.
+    # Transition tables let one trigger call absorb a whole COPY or batch.
+    (4, "trigger-maintained dashboard summary tables", False, [
+        """
+        CREATE TABLE IF NOT EXISTS table_counts (
+            table_name VARCHAR(50) PRIMARY KEY,
+            row_count BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        # one row per registration day; week/month/year trends roll these up
+        """
+        CREATE TABLE IF NOT EXISTS registrations_daily (
+            day DATE PRIMARY KEY,
+            registrations BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS program_student_counts (
+            program_code VARCHAR(20) PRIMARY KEY,
+            student_count BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        # bumped by every write to the summarized tables; clients use it as an ETag
+        """
+        CREATE TABLE IF NOT EXISTS summary_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT INTO summary_version (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING",
+        """
+        DO $$ BEGIN
+            CREATE TYPE student_summary_delta AS (day DATE, program_code VARCHAR(20), n BIGINT);
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$
+        """,
+        """
+        CREATE OR REPLACE FUNCTION apply_student_summary_deltas(deltas student_summary_delta[])
+        RETURNS void AS $$
+        BEGIN
+            INSERT INTO table_counts AS t (table_name, row_count)
+            SELECT 'students', COALESCE(SUM(n), 0) FROM unnest(deltas)
+            ON CONFLICT (table_name) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+
+            INSERT INTO registrations_daily AS r (day, registrations)
+            SELECT day, SUM(n) FROM unnest(deltas) WHERE day IS NOT NULL GROUP BY day
+            ON CONFLICT (day) DO UPDATE SET registrations = r.registrations + EXCLUDED.registrations;
+
+            INSERT INTO program_student_counts AS p (program_code, student_count)
+            SELECT program_code, SUM(n) FROM unnest(deltas) WHERE program_code IS NOT NULL GROUP BY program_code
+            ON CONFLICT (program_code) DO UPDATE SET student_count = p.student_count + EXCLUDED.student_count;
+
+            UPDATE summary_version SET version = version + 1;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION students_summary_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM apply_student_summary_deltas(ARRAY(
+                    SELECT ROW(date_registered::date, program_code, COUNT(*))::student_summary_delta
+                    FROM new_rows GROUP BY 1, 2));
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM apply_student_summary_deltas(ARRAY(
+                    SELECT ROW(date_registered::date, program_code, -COUNT(*))::student_summary_delta
+                    FROM old_rows GROUP BY 1, 2));
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM apply_student_summary_deltas(ARRAY(
+                    SELECT ROW(day, program_code, SUM(n))::student_summary_delta
+                    FROM (
+                        SELECT date_registered::date AS day, program_code, 1 AS n FROM new_rows
+                        UNION ALL
+                        SELECT date_registered::date, program_code, -1 FROM old_rows
+                    ) moved
+                    GROUP BY day, program_code
+                    HAVING SUM(n) <> 0));
+            ELSE  -- TRUNCATE
+                UPDATE table_counts SET row_count = 0 WHERE table_name = 'students';
+                DELETE FROM registrations_daily;
+                DELETE FROM program_student_counts;
+                UPDATE summary_version SET version = version + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION table_count_trigger() RETURNS trigger AS $$
+        DECLARE
+            delta BIGINT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT COUNT(*) INTO delta FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT -COUNT(*) INTO delta FROM old_rows;
+            ELSE
+                delta := 0;
+            END IF;
+            IF TG_OP = 'TRUNCATE' THEN
+                UPDATE table_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            ELSE
+                INSERT INTO table_counts AS t (table_name, row_count) VALUES (TG_TABLE_NAME, delta)
+                ON CONFLICT (table_name) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+            END IF;
+            UPDATE summary_version SET version = version + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS students_summary_insert ON students",
+        "DROP TRIGGER IF EXISTS students_summary_update ON students",
+        "DROP TRIGGER IF EXISTS students_summary_delete ON students",
+        "DROP TRIGGER IF EXISTS students_summary_truncate ON students",
+        """
+        CREATE TRIGGER students_summary_insert AFTER INSERT ON students
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE students_summary_trigger()
+        """,
+        """
+        CREATE TRIGGER students_summary_update AFTER UPDATE ON students
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE students_summary_trigger()
+        """,
+        """
+        CREATE TRIGGER students_summary_delete AFTER DELETE ON students
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE PROCEDURE students_summary_trigger()
+        """,
+        """
+        CREATE TRIGGER students_summary_truncate AFTER TRUNCATE ON students
+        FOR EACH STATEMENT EXECUTE PROCEDURE students_summary_trigger()
+        """,
+    ] + [
+        statement.format(table=table)
+        for table in ('programs', 'colleges')
+        for statement in (
+            "DROP TRIGGER IF EXISTS {table}_count_insert ON {table}",
+            "DROP TRIGGER IF EXISTS {table}_count_update ON {table}",
+            "DROP TRIGGER IF EXISTS {table}_count_delete ON {table}",
+            "DROP TRIGGER IF EXISTS {table}_count_truncate ON {table}",
+            """
+            CREATE TRIGGER {table}_count_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE table_count_trigger()
+            """,
+            # renames change no counts but do change what the dashboard shows
+            """
+            CREATE TRIGGER {table}_count_update AFTER UPDATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE table_count_trigger()
+            """,
+            """
+            CREATE TRIGGER {table}_count_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE table_count_trigger()
+            """,
+            """
+            CREATE TRIGGER {table}_count_truncate AFTER TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE table_count_trigger()
+            """,
+        )
+    ] + [
+        # backfill under a lock that holds off writes, so no change slips between the two
+        "LOCK TABLE students, programs, colleges IN SHARE MODE",
+        "DELETE FROM table_counts",
+        """
+        INSERT INTO table_counts (table_name, row_count)
+        SELECT 'students', COUNT(*) FROM students
+        UNION ALL SELECT 'programs', COUNT(*) FROM programs
+        UNION ALL SELECT 'colleges', COUNT(*) FROM colleges
+        """,
+        "DELETE FROM registrations_daily",
+        """
+        INSERT INTO registrations_daily (day, registrations)
+        SELECT date_registered::date, COUNT(*) FROM students
+        WHERE date_registered IS NOT NULL GROUP BY 1
+        """,
+        "DELETE FROM program_student_counts",
+        """
+        INSERT INTO program_student_counts (program_code, student_count)
+        SELECT program_code, COUNT(*) FROM students
+        WHERE program_code IS NOT NULL GROUP BY 1
+        """,
+        "UPDATE summary_version SET version = version + 1",
+    ]),
+    # The summary triggers also NOTIFY dashboard_changes with the new version
+    # and what changed, so open dashboards update from app/dashboard/live.py
+    # instead of polling. Versions are bumped under the summary_version row
+    # lock, so listeners see them gap-free and in commit order.
+    (5, "dashboard change notifications", False, [
+        """
+        CREATE OR REPLACE FUNCTION notify_dashboard(payload jsonb) RETURNS void AS $$
+        BEGIN
+            -- NOTIFY payloads are capped at 8000 bytes; past that listeners refetch
+            IF octet_length(payload::text) > 7900 THEN
+                payload := jsonb_build_object('table', payload->'table', 'version', payload->'version', 'resync', true);
+            END IF;
+            PERFORM pg_notify('dashboard_changes', payload::text);
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION apply_student_summary_deltas(deltas student_summary_delta[])
+        RETURNS void AS $$
+        DECLARE
+            new_version BIGINT;
+        BEGIN
+            INSERT INTO table_counts AS t (table_name, row_count)
+            SELECT 'students', COALESCE(SUM(n), 0) FROM unnest(deltas)
+            ON CONFLICT (table_name) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+
+            INSERT INTO registrations_daily AS r (day, registrations)
+            SELECT day, SUM(n) FROM unnest(deltas) WHERE day IS NOT NULL GROUP BY day
+            ON CONFLICT (day) DO UPDATE SET registrations = r.registrations + EXCLUDED.registrations;
+
+            INSERT INTO program_student_counts AS p (program_code, student_count)
+            SELECT program_code, SUM(n) FROM unnest(deltas) WHERE program_code IS NOT NULL GROUP BY program_code
+            ON CONFLICT (program_code) DO UPDATE SET student_count = p.student_count + EXCLUDED.student_count;
+
+            UPDATE summary_version SET version = version + 1 RETURNING version INTO new_version;
+
+            -- deltas by day and program name, plus the latest registrations as
+            -- this statement leaves them (updates and deletes can change those too)
+            PERFORM notify_dashboard(jsonb_build_object(
+                'table', 'students',
+                'version', new_version,
+                'deltas', (
+                    SELECT COALESCE(jsonb_agg(jsonb_build_array(d.day, p.program_name, d.n)), '[]')
+                    FROM (SELECT day, program_code, SUM(n) AS n FROM unnest(deltas) GROUP BY 1, 2) d
+                    LEFT JOIN programs p ON p.program_code = d.program_code),
+                'recent', (
+                    SELECT COALESCE(jsonb_agg(jsonb_build_array(
+                        r.first_name, r.last_name, r.program_name, r.college_name, r.date_registered)
+                        ORDER BY r.date_registered DESC), '[]')
+                    FROM (
+                        SELECT s.first_name, s.last_name, p.program_name, c.college_name, s.date_registered
+                        FROM students s
+                        LEFT JOIN programs p ON s.program_code = p.program_code
+                        LEFT JOIN colleges c ON p.college_code = c.college_code
+                        WHERE s.date_registered IS NOT NULL
+                        ORDER BY s.date_registered DESC
+                        LIMIT 10
+                    ) r)
+            ));
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION students_summary_trigger() RETURNS trigger AS $$
+        DECLARE
+            new_version BIGINT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM apply_student_summary_deltas(ARRAY(
+                    SELECT ROW(date_registered::date, program_code, COUNT(*))::student_summary_delta
+                    FROM new_rows GROUP BY 1, 2));
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM apply_student_summary_deltas(ARRAY(
+                    SELECT ROW(date_registered::date, program_code, -COUNT(*))::student_summary_delta
+                    FROM old_rows GROUP BY 1, 2));
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM apply_student_summary_deltas(ARRAY(
+                    SELECT ROW(day, program_code, SUM(n))::student_summary_delta
+                    FROM (
+                        SELECT date_registered::date AS day, program_code, 1 AS n FROM new_rows
+                        UNION ALL
+                        SELECT date_registered::date, program_code, -1 FROM old_rows
+                    ) moved
+                    GROUP BY day, program_code
+                    HAVING SUM(n) <> 0));
+            ELSE  -- TRUNCATE
+                UPDATE table_counts SET row_count = 0 WHERE table_name = 'students';
+                DELETE FROM registrations_daily;
+                DELETE FROM program_student_counts;
+                UPDATE summary_version SET version = version + 1 RETURNING version INTO new_version;
+                PERFORM notify_dashboard(jsonb_build_object('table', 'students', 'version', new_version, 'resync', true));
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION table_count_trigger() RETURNS trigger AS $$
+        DECLARE
+            delta BIGINT;
+            new_version BIGINT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT COUNT(*) INTO delta FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT -COUNT(*) INTO delta FROM old_rows;
+            ELSE
+                delta := 0;
+            END IF;
+            IF TG_OP = 'TRUNCATE' THEN
+                UPDATE table_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            ELSE
+                INSERT INTO table_counts AS t (table_name, row_count) VALUES (TG_TABLE_NAME, delta)
+                ON CONFLICT (table_name) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+            END IF;
+            UPDATE summary_version SET version = version + 1 RETURNING version INTO new_version;
+            PERFORM notify_dashboard(jsonb_build_object(
+                'table', TG_TABLE_NAME, 'op', TG_OP, 'version', new_version, 'delta', delta));
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+    # Holds on handed-out student IDs (Students.reserve_next_id). A migration
+    # rather than a bootstrap stage so `migrate` creates it on live registries.
+    (6, "student ID reservations", False, [
+        """
+        CREATE TABLE IF NOT EXISTS student_id_reservations (
+            id_number VARCHAR(15) PRIMARY KEY,
+            reserved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            holder VARCHAR(64)
+        )
+        """,
+        # tables created by the earlier bootstrap stage predate the holder column
+        "ALTER TABLE student_id_reservations ADD COLUMN IF NOT EXISTS holder VARCHAR(64)",
+        "CREATE INDEX IF NOT EXISTS idx_student_id_reservations_holder ON student_id_reservations (holder)",
+    ]),
+    # Summary upkeep moves to commit time. The statement triggers now only note
+    # their deltas in summary_pending (rows keyed by transaction, so writers
+    # never share a row) and skip statements that changed nothing. The first
+    # change in a transaction also inserts its summary_pending_tx row, whose
+    # deferred trigger applies the deltas, bumps the version and sends one
+    # NOTIFY as the transaction commits: the hot summary rows are locked for
+    # the length of a commit rather than the rest of every writing transaction.
+    (7, "apply dashboard summaries at commit", False, [
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS summary_pending (
+            txid BIGINT NOT NULL,
+            table_name VARCHAR(20) NOT NULL,
+            op VARCHAR(10) NOT NULL,
+            day DATE,
+            program_code VARCHAR(20),
+            n BIGINT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_summary_pending_txid ON summary_pending (txid)",
+        "CREATE UNLOGGED TABLE IF NOT EXISTS summary_pending_tx (txid BIGINT PRIMARY KEY)",
+        """
+        CREATE OR REPLACE FUNCTION mark_summary_pending() RETURNS BIGINT AS $$
+            -- only the transaction's first call inserts, so the flush is queued once
+            INSERT INTO summary_pending_tx (txid) VALUES (txid_current()) ON CONFLICT (txid) DO NOTHING;
+            SELECT txid_current();
+        $$ LANGUAGE sql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION students_summary_trigger() RETURNS trigger AS $$
+        DECLARE
+            tx BIGINT;
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                tx := mark_summary_pending();
+                DELETE FROM summary_pending WHERE txid = tx AND table_name = 'students';
+                UPDATE table_counts SET row_count = 0 WHERE table_name = 'students';
+                DELETE FROM registrations_daily;
+                DELETE FROM program_student_counts;
+                INSERT INTO summary_pending (txid, table_name, op, n) VALUES (tx, 'students', TG_OP, 0);
+                RETURN NULL;
+            END IF;
+
+            -- a statement that matched no rows changes nothing
+            IF TG_OP = 'DELETE' THEN
+                PERFORM 1 FROM old_rows LIMIT 1;
+            ELSE
+                PERFORM 1 FROM new_rows LIMIT 1;
+            END IF;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+
+            tx := mark_summary_pending();
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO summary_pending (txid, table_name, op, day, program_code, n)
+                SELECT tx, 'students', TG_OP, date_registered::date, program_code, COUNT(*)
+                FROM new_rows GROUP BY 4, 5;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO summary_pending (txid, table_name, op, day, program_code, n)
+                SELECT tx, 'students', TG_OP, date_registered::date, program_code, -COUNT(*)
+                FROM old_rows GROUP BY 4, 5;
+            ELSE
+                -- the zero row records the update even when no count moved: names
+                -- and dates shown in the recent list may still have changed
+                INSERT INTO summary_pending (txid, table_name, op, day, program_code, n)
+                SELECT tx, 'students', TG_OP, day, program_code, SUM(n)
+                FROM (
+                    SELECT date_registered::date AS day, program_code, 1 AS n FROM new_rows
+                    UNION ALL
+                    SELECT date_registered::date, program_code, -1 FROM old_rows
+                ) moved
+                GROUP BY day, program_code
+                HAVING SUM(n) <> 0
+                UNION ALL
+                SELECT tx, 'students', TG_OP, NULL, NULL, 0;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION table_count_trigger() RETURNS trigger AS $$
+        DECLARE
+            tx BIGINT;
+            delta BIGINT;
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                tx := mark_summary_pending();
+                DELETE FROM summary_pending WHERE txid = tx AND table_name = TG_TABLE_NAME;
+                UPDATE table_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+                INSERT INTO summary_pending (txid, table_name, op, n) VALUES (tx, TG_TABLE_NAME, TG_OP, 0);
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP = 'DELETE' THEN
+                SELECT -COUNT(*) INTO delta FROM old_rows;
+            ELSE
+                SELECT COUNT(*) INTO delta FROM new_rows;
+            END IF;
+            IF delta = 0 THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'UPDATE' THEN
+                delta := 0;
+            END IF;
+
+            tx := mark_summary_pending();
+            INSERT INTO summary_pending (txid, table_name, op, n) VALUES (tx, TG_TABLE_NAME, TG_OP, delta);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION flush_summary_changes() RETURNS trigger AS $$
+        DECLARE
+            tx BIGINT := NEW.txid;
+            tables TEXT[];
+            truncated BOOLEAN;
+            renamed BOOLEAN;
+            new_version BIGINT;
+        BEGIN
+            SELECT array_agg(DISTINCT table_name ORDER BY table_name),
+                   bool_or(op = 'TRUNCATE'), bool_or(op = 'UPDATE')
+            INTO tables, truncated, renamed
+            FROM summary_pending WHERE txid = tx;
+
+            INSERT INTO table_counts AS t (table_name, row_count)
+            -- rows in key order, so two committing writers cannot deadlock on them
+            SELECT table_name, SUM(n) FROM summary_pending WHERE txid = tx GROUP BY 1 HAVING SUM(n) <> 0 ORDER BY 1
+            ON CONFLICT (table_name) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+
+            INSERT INTO registrations_daily AS r (day, registrations)
+            SELECT day, SUM(n) FROM summary_pending
+            WHERE txid = tx AND table_name = 'students' AND day IS NOT NULL
+            GROUP BY 1 HAVING SUM(n) <> 0 ORDER BY 1
+            ON CONFLICT (day) DO UPDATE SET registrations = r.registrations + EXCLUDED.registrations;
+
+            INSERT INTO program_student_counts AS p (program_code, student_count)
+            SELECT program_code, SUM(n) FROM summary_pending
+            WHERE txid = tx AND table_name = 'students' AND program_code IS NOT NULL
+            GROUP BY 1 HAVING SUM(n) <> 0 ORDER BY 1
+            ON CONFLICT (program_code) DO UPDATE SET student_count = p.student_count + EXCLUDED.student_count;
+
+            -- last, so the version row is held only until this commit finishes
+            UPDATE summary_version SET version = version + 1 RETURNING version INTO new_version;
+
+            IF tables = ARRAY['students'] AND NOT truncated THEN
+                -- deltas by day and program name, plus the latest registrations
+                -- as the transaction leaves them
+                PERFORM notify_dashboard(jsonb_build_object(
+                    'table', 'students',
+                    'version', new_version,
+                    'deltas', (
+                        SELECT COALESCE(jsonb_agg(jsonb_build_array(d.day, p.program_name, d.n)), '[]')
+                        FROM (
+                            SELECT day, program_code, SUM(n) AS n FROM summary_pending
+                            WHERE txid = tx GROUP BY 1, 2 HAVING SUM(n) <> 0
+                        ) d
+                        LEFT JOIN programs p ON p.program_code = d.program_code),
+                    'recent', (
+                        SELECT COALESCE(jsonb_agg(jsonb_build_array(
+                            r.first_name, r.last_name, r.program_name, r.college_name, r.date_registered)
+                            ORDER BY r.date_registered DESC), '[]')
+                        FROM (
+                            SELECT s.first_name, s.last_name, p.program_name, c.college_name, s.date_registered
+                            FROM students s
+                            LEFT JOIN programs p ON s.program_code = p.program_code
+                            LEFT JOIN colleges c ON p.college_code = c.college_code
+                            WHERE s.date_registered IS NOT NULL
+                            ORDER BY s.date_registered DESC
+                            LIMIT 10
+                        ) r)
+                ));
+            ELSIF tables = ARRAY['colleges'] AND NOT truncated AND NOT renamed THEN
+                PERFORM notify_dashboard(jsonb_build_object(
+                    'table', 'colleges', 'version', new_version,
+                    'delta', (SELECT SUM(n) FROM summary_pending WHERE txid = tx)));
+            ELSE
+                -- program changes, renames and mixed transactions reshape the page
+                PERFORM notify_dashboard(jsonb_build_object('version', new_version, 'resync', true));
+            END IF;
+
+            DELETE FROM summary_pending WHERE txid = tx;
+            DELETE FROM summary_pending_tx WHERE txid = tx;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS summary_pending_flush ON summary_pending_tx",
+        """
+        CREATE CONSTRAINT TRIGGER summary_pending_flush AFTER INSERT ON summary_pending_tx
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE PROCEDURE flush_summary_changes()
+        """,
+    ] + [
+        # update triggers need the new rows now, to skip updates that matched none
+        statement.format(table=table)
+        for table in ('programs', 'colleges')
+        for statement in (
+            "DROP TRIGGER IF EXISTS {table}_count_update ON {table}",
+            """
+            CREATE TRIGGER {table}_count_update AFTER UPDATE ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE table_count_trigger()
+            """,
+        )
+    ] + [
+        "DROP FUNCTION IF EXISTS apply_student_summary_deltas(student_summary_delta[])",
+        "DROP TYPE IF EXISTS student_summary_delta",
+    ]),
+]
+
+# the index a concurrent migration statement builds, for retry cleanup
+CONCURRENT_INDEX_NAME = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.I)
+
+# any constant works; it only keeps two processes from migrating at once
+MIGRATION_LOCK_ID = 7210013
+
+
+def migrate(conn=None):
+    """Apply every migration newer than the recorded schema version.
+
+    Runs on one autocommit connection under an advisory lock. A concurrent
+    build that fails leaves an INVALID index behind, which IF NOT EXISTS would
+    then skip, so invalid indexes are dropped before a migration is retried.
+    Raises on the first failure; the failed version is not recorded.
+    Pass `conn` to reuse an open connection; it is left open.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    conn.autocommit = True
     cur = conn.cursor()
     try:
-        extras.execute_values(cur, insert_query, user_infos)
-        conn.commit()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(200) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+            current = cur.fetchone()[0]
+            for version, description, concurrent, statements in MIGRATIONS:
+                if version <= current:
+                    continue
+                if concurrent:
+                    _drop_invalid_indexes(cur, statements)
+                    for statement in statements:
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                else:
+                    # one transaction: the statements and the version row
+                    conn.autocommit = False
+                    try:
+                        with conn:
+                            for statement in statements:
+                                cur.execute(statement)
+                            cur.execute(
+                                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                                (version, description)
+                            )
+                    finally:
+                        conn.autocommit = True
+                print(f"Applied migration {version}: {description}")
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
+        else:
+            conn.autocommit = False
+
+
+def _drop_invalid_indexes(cur, statements):
+    """Drop INVALID leftovers of this migration's own concurrent builds.
+
+    Only the index names the statements create are considered; invalid
+    indexes from other migrations or tools, including builds still running,
+    are left alone.
+    """
+    names = [m.group(1) for m in map(CONCURRENT_INDEX_NAME.search, statements) if m]
+    if not names:
+        return
+    cur.execute("""
+    SELECT n.nspname, c.relname
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE NOT i.indisvalid AND n.nspname = current_schema() AND c.relname = ANY(%s)
+    """, (names,))
+    for schema, name in cur.fetchall():
+        cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}.{}").format(
+            sql.Identifier(schema), sql.Identifier(name)
+        ))
+
+
+# Bootstrap stages in dependency order; each runs in its own transaction.
+STAGES = [
+    ready_college_table,
+    ready_program_table,
+    ready_student_table,
+    ready_year_level_table,
+    ready_years_table,
+    ready_users_table,
+    ready_user_info_table,
+]
 
 
 def initialize_db():
+    """Create the database, tables, seed data and indexes over one connection.
+
+    Each stage commits on its own, and the first error aborts the bootstrap
+    instead of being printed and skipped. Tables that already hold rows are
+    not re-seeded.
+    """
     create_database()
-    ready_college_table()
-    ready_program_table()
-    ready_student_table()
-    ready_year_level_table()
-    ready_years_table()
-    ready_users_table()
-    ready_user_info_table()
+    conn = get_connection()
+    try:
+        for stage in STAGES:
+            with conn:
+                with conn.cursor() as cur:
+                    stage(cur)
+        migrate(conn)
+    finally:
+        conn.close()
 
 
 if __name__ == '__main__':
-    initialize_db()
-    print("Database and tables initialized successfully.")
+    # `python -m app.db_init migrate` applies only the pending migrations
+    if sys.argv[1:] == ['migrate']:
+        migrate()
+        print("Migrations applied successfully.")
+    else:
+        initialize_db()
+        print("Database and tables initialized successfully.")
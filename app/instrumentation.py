@@ -0,0 +1,55 @@
+import json
+import logging
+import time
+from flask import g, request
+from app import db, metrics
+from config import REQUEST_LOG
+
+logger = logging.getLogger('app.requests')
+
+
+def init_app(app):
+    """Time every request and report its database work.
+
+    Each response gets a Server-Timing header (total, database and pool wait,
+    visible in the browser's network panel) and, unless REQUEST_LOG is off,
+    one JSON log line with the same numbers plus route and status. The same
+    numbers feed the /metrics histograms.
+    """
+    if REQUEST_LOG and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def report_timing(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        stats = db.request_stats()
+        response.headers.add('Server-Timing', ', '.join([
+            f'app;dur={total * 1000:.2f}',
+            f'db;dur={stats["db_seconds"] * 1000:.2f};desc="{stats["queries"]} queries"',
+            f'pool;dur={stats["pool_wait_seconds"] * 1000:.2f}',
+        ]))
+        metrics.observe_request(request.blueprint, request.endpoint, request.method,
+                                response.status_code, total, stats)
+        if REQUEST_LOG:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 2),
+                'db_queries': stats['queries'],
+                'db_ms': round(stats['db_seconds'] * 1000, 2),
+                'pool_wait_ms': round(stats['pool_wait_seconds'] * 1000, 2),
+            }))
+        return response
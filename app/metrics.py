@@ -0,0 +1,289 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Counters and histograms live in plain dicts keyed by label values, each
+family behind its own lock, so recording costs one short critical section.
+With METRICS_DIR set, every worker also snapshots its values to
+METRICS_DIR/<pid>.json (at most every METRICS_FLUSH_SECONDS and on exit),
+and /metrics merges all snapshots, so one scrape covers every gunicorn worker.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from config import METRICS_DIR, METRICS_FLUSH_SECONDS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels):
+        self.name, self.help, self.labels = name, help, labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(k): v for k, v in self._values.items()}
+
+    @staticmethod
+    def merge(into, values):
+        for key, value in values.items():
+            into[key] = into.get(key, 0) + value
+
+    def render(self, values):
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, json.loads(key))} {_number(value)}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(k): [list(s[0]), s[1], s[2]] for k, s in self._values.items()}
+
+    @staticmethod
+    def merge(into, values):
+        for key, (buckets, total, count) in values.items():
+            if key not in into:
+                into[key] = [list(buckets), total, count]
+                continue
+            current = into[key]
+            current[0] = [a + b for a, b in zip(current[0], buckets)]
+            current[1] += total
+            current[2] += count
+
+    def render(self, values):
+        for key, (buckets, total, count) in sorted(values.items()):
+            label_values = json.loads(key)
+            cumulative = 0
+            for bound, n in zip(self.buckets, buckets):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(self.labels + ['le'], label_values + [_number(bound)])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labels + ['le'], label_values + ['+Inf'])} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {count}"
+
+
+class Sampled:
+    """Values read from elsewhere (the pool) whenever a snapshot is taken.
+
+    As a gauge they are summed across live workers only; as a counter a dead
+    worker's last values keep counting.
+    """
+
+    def __init__(self, name, help, labels, read, kind='gauge'):
+        self.name, self.help, self.labels, self._read, self.kind = name, help, labels, read, kind
+
+    def snapshot(self):
+        return {json.dumps(k): v for k, v in self._read().items()}
+
+    merge = staticmethod(Counter.merge)
+    render = Counter.render
+
+
+REQUESTS = Counter('http_requests_total', 'Requests by route and status.',
+                   ['blueprint', 'endpoint', 'method', 'status'])
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency by route.',
+                            ['blueprint', 'endpoint', 'method'])
+QUERIES = Counter('db_queries_total', 'SQL statements sent, by route.', ['endpoint'])
+QUERY_SECONDS = Counter('db_query_seconds_total', 'Time spent in SQL statements, by route.', ['endpoint'])
+QUERIES_PER_REQUEST = Histogram('db_queries_per_request', 'SQL statements per request, by route.',
+                                ['endpoint'], buckets=QUERY_BUCKETS)
+STORAGE_SECONDS = Histogram('supabase_storage_request_duration_seconds', 'Supabase storage call latency.',
+                            ['operation', 'outcome'])
+
+
+def _pool_gauges():
+    from app import db
+    if db.db_pool is None:
+        return {}
+    stats = db.db_pool.stats()
+    return {
+        ('in_use',): stats['in_use'],
+        ('idle',): stats['idle'],
+        ('max',): stats['max'],
+    }
+
+
+def _pool_counters():
+    from app import db
+    if db.db_pool is None:
+        return {}
+    stats = db.db_pool.stats()
+    return {
+        ('checkouts',): stats['checkouts'],
+        ('waits',): stats['waits'],
+        ('timeouts',): stats['timeouts'],
+        ('wait_seconds',): stats['wait_seconds_total'],
+    }
+
+
+POOL_CONNECTIONS = Sampled('db_pool_connections', 'Pooled connections by state.', ['state'], _pool_gauges)
+# the pool keeps its own running totals
+POOL_EVENTS = Sampled('db_pool_events_total', 'Pool checkouts, waits, timeouts and seconds spent waiting.',
+                      ['event'], _pool_counters, kind='counter')
+
+FAMILIES = [REQUESTS, REQUEST_SECONDS, QUERIES, QUERY_SECONDS, QUERIES_PER_REQUEST,
+            STORAGE_SECONDS, POOL_CONNECTIONS, POOL_EVENTS]
+
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+def observe_request(blueprint, endpoint, method, status, seconds, db_stats):
+    """Record one finished request; called by app.instrumentation."""
+    blueprint = blueprint or ''
+    endpoint = endpoint or 'unmatched'  # 404s: never label by raw path
+    REQUESTS.inc(blueprint, endpoint, method, str(status))
+    REQUEST_SECONDS.observe(seconds, blueprint, endpoint, method)
+    QUERIES.inc(endpoint, amount=db_stats['queries'])
+    QUERY_SECONDS.inc(endpoint, amount=db_stats['db_seconds'])
+    QUERIES_PER_REQUEST.observe(db_stats['queries'], endpoint)
+    _maybe_flush()
+
+
+class TimedBucket:
+    """Wraps a storage bucket so each call lands in the storage latency histogram."""
+
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def __getattr__(self, operation):
+        method = getattr(self._bucket, operation)
+        if not callable(method):
+            return method
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = method(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                STORAGE_SECONDS.observe(time.perf_counter() - start, operation, outcome)
+        return timed
+
+
+def timed_bucket(client, name):
+    return TimedBucket(client.storage.from_(name))
+
+
+def render():
+    """All families in the Prometheus text exposition format."""
+    merged = _collect()
+    lines = []
+    for family in FAMILIES:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        lines.extend(family.render(merged.get(family.name, {})))
+    return '\n'.join(lines) + '\n'
+
+
+def _snapshot():
+    return {'pid': os.getpid(), 'families': {f.name: f.snapshot() for f in FAMILIES}}
+
+
+def _collect():
+    """This worker's live values plus every other worker's last snapshot."""
+    snapshots = [_snapshot()]
+    if METRICS_DIR and os.path.isdir(METRICS_DIR):
+        for filename in os.listdir(METRICS_DIR):
+            if not filename.endswith('.json') or filename == f'{os.getpid()}.json':
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced or a partial write from a crash
+    merged = {}
+    for snapshot in snapshots:
+        alive = snapshot['pid'] == os.getpid() or _alive(snapshot['pid'])
+        for family in FAMILIES:
+            # gauges describe a live process; a dead worker's counters still count
+            if family.kind == 'gauge' and not alive:
+                continue
+            family.merge(merged.setdefault(family.name, {}), snapshot['families'].get(family.name, {}))
+    return merged
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _maybe_flush():
+    global _last_flush
+    if not METRICS_DIR:
+        return
+    now = time.monotonic()
+    if now - _last_flush < METRICS_FLUSH_SECONDS or not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = now
+        flush()
+    finally:
+        _flush_lock.release()
+
+
+def flush():
+    """Write this worker's snapshot atomically to METRICS_DIR."""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp, path)
+
+
+atexit.register(flush)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
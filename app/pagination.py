@@ -0,0 +1,57 @@
+import base64
+import json
+
+
+def encode_cursor(sort_by, values):
+    """Return an opaque `after` token for the row whose sort key is `values`."""
+    payload = json.dumps({'s': sort_by, 'k': list(values)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort_by, size):
+    """Decode an `after` token, raising ValueError if it is malformed or was
+    issued for a different sort order."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload['k']
+    except Exception:
+        raise ValueError('Invalid pagination cursor')
+    if payload.get('s') != sort_by or not isinstance(values, list) or len(values) != size:
+        raise ValueError('Pagination cursor does not match the requested sort')
+    return values
+
+
+def keyset_clause(order_keys, after, sort_by):
+    """Build the seek predicate for `after`, e.g. "(s.first_name, s.id_number) > (%s, %s)".
+
+    `order_keys` are the ORDER BY expressions, ending with the unique
+    tie-breaker column. Returns (sql, params).
+    """
+    values = decode_cursor(after, sort_by, len(order_keys))
+    columns = ', '.join(order_keys)
+    placeholders = ', '.join(['%s'] * len(order_keys))
+    return f"({columns}) > ({placeholders})", values
+
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+def estimate_count(cursor, from_sql, where_sql, params):
+    """Return the planner's row estimate for a list query instead of counting it.
+
+    Costs a planning round trip rather than a scan, so it stays cheap no
+    matter how large the table grows; accuracy follows the table statistics.
+    """
+    cursor.execute("EXPLAIN (FORMAT JSON) SELECT 1 " + from_sql + where_sql, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def total_pages(total, per_page):
+    """Ceiling division, or None when the total was not counted."""
+    if total is None:
+        return None
+    return (total + per_page - 1) // per_page
@@ -1,6 +1,8 @@
 from . import programs_bp
-from flask import render_template, session, redirect, url_for, request, flash, jsonify
+from flask import render_template, session, redirect, url_for, request, flash, jsonify, make_response
 from .models import Programs
+from app import reference
+from app.pagination import COUNT_MODES
 from .forms import ProgramForm, ProgramUpdateForm
 from app.colleges.models import Colleges
 
@@ -12,7 +14,7 @@ def list():
 
     # Get search, sort, and pagination parameters
     search = request.args.get('q', '')
-    sort_by = request.args.get('sort', 'code')
+    sort_by = request.args.get('sort') or ('relevance' if search else 'code')
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
 
@@ -177,17 +179,53 @@ def api_list_programs():
     try:
         # Get search, sort, and pagination parameters
         search = request.args.get('q', '')
-        sort_by = request.args.get('sort', 'code')
+        sort_by = request.args.get('sort') or ('relevance' if search else 'code')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
+        # opaque cursor from a previous response's next_cursor (keyset paging)
+        after = request.args.get('after', '')
+        # exact | estimate | none - how the total is computed
+        count = request.args.get('count', 'exact')
+        if count not in COUNT_MODES:
+            return jsonify({'success': False, 'error': f'count must be one of: {", ".join(COUNT_MODES)}'}), 400
 
         # Get paginated programs data
-        programs_data = Programs.get_all(search=search, sort_by=sort_by, page=page, per_page=per_page)
+        programs_data = Programs.get_all(search=search, sort_by=sort_by, page=page, per_page=per_page, after=after if after else None, count=count)
 
         return jsonify({
             'success': True,
             'data': programs_data
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@programs_bp.route('/api/programs/options', methods=['GET'])
+def api_program_options():
+    """Code/name pairs for select boxes.
+
+    Served from the reference cache with a strong ETag (a hash of the cached
+    data, the same in every worker) and revalidated on each use, so a page
+    view costs a 304 unless the programs changed.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        snapshot = reference.snapshot()
+        etag = f'programs-{snapshot.version}'
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = jsonify({
+                'success': True,
+                'data': [{'code': item['code'], 'name': item['name']} for item in snapshot.programs]
+            })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
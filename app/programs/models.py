@@ -1,4 +1,10 @@
-from app import db_pool
+from app.db import connection
+from app import reference
+from app.dashboard.models import Dashboard
+from app.pagination import COUNT_MODES, encode_cursor, estimate_count, keyset_clause, total_pages
+
+# Must stay identical to the expression behind idx_programs_search_trgm in db_init.
+SEARCH_DOCUMENT = "LOWER(p.program_code || ' ' || p.program_name)"
 
 
 class Programs:
@@ -8,8 +14,7 @@ class Programs:
         self.college_code = college_code
 
     def add(self):
-        conn = db_pool.getconn()
-        try:
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
@@ -20,77 +25,120 @@ class Programs:
                     (self.program_code, self.program_name, self.college_code)
                 )
                 conn.commit()
-        finally:
-            db_pool.putconn(conn)
+                Dashboard.invalidate()
+                reference.invalidate()
 
     @staticmethod
-    def get_all(search=None, sort_by=None, page=1, per_page=10):
-        """Return paginated programs with college name joined."""
-        conn = db_pool.getconn()
-        try:
-            with conn.cursor() as cursor:
+    def get_all(search=None, sort_by=None, page=1, per_page=10, after=None, count='exact'):
+        """Return paginated programs with college name joined.
 
-                # --------------------------------------------
-                # 1. COUNT QUERY
-                # --------------------------------------------
-                count_query = """
-                    SELECT COUNT(*)
-                    FROM programs p
-                    LEFT JOIN colleges c ON p.college_code = c.college_code
-                """
-                count_params = []
-
-                if search:
-                    count_query += """
-                    WHERE LOWER(p.program_code) LIKE LOWER(%s)
-                    OR LOWER(p.program_name) LIKE LOWER(%s)
-                    OR LOWER(c.college_name) LIKE LOWER(%s)
-                    """
-                    search_term = f"%{search}%"
-                    count_params.extend([search_term, search_term, search_term])
+        Pass the previous response's `next_cursor` as `after` to seek past it
+        instead of using OFFSET. `count` is 'exact', 'estimate' or 'none',
+        as in Students.get_all.
+        """
+        if count not in COUNT_MODES:
+            count = 'exact'
 
-                cursor.execute(count_query, count_params)
-                total = cursor.fetchone()[0]
+        with connection(readonly=True) as conn:
+            with conn.cursor() as cursor:
 
                 # --------------------------------------------
-                # 2. MAIN QUERY
+                # 1. FILTERS
                 # --------------------------------------------
-                query = """
-                    SELECT p.program_code, p.program_name, p.college_code, c.college_name
+                from_sql = """
                     FROM programs p
                     LEFT JOIN colleges c ON p.college_code = c.college_code
                 """
-                params = []
+                filter_params = []
+                where_sql = ""
 
                 if search:
-                    query += """
-                    WHERE LOWER(p.program_code) LIKE LOWER(%s)
-                    OR LOWER(p.program_name) LIKE LOWER(%s)
-                    OR LOWER(c.college_name) LIKE LOWER(%s)
+                    where_sql = f"""
+                    WHERE ({SEARCH_DOCUMENT} LIKE %s
+                    OR p.college_code = ANY(ARRAY(
+                        SELECT college_code FROM colleges WHERE LOWER(college_name) LIKE %s)))
                     """
-                    params.extend([search_term, search_term, search_term])
+                    search_term = f"%{search.lower()}%"
+                    filter_params.extend([search_term, search_term])
 
                 # --------------------------------------------
-                # 3. SORTING
+                # 2. SORTING
                 # --------------------------------------------
                 sort_mapping = {
                     'code': 'p.program_code',
                     'name': 'p.program_name',
-                    'college_name': 'c.college_name'
+                    'college_name': "COALESCE(c.college_name, '')"
                 }
 
-                sort_column = sort_mapping.get(sort_by, 'p.program_code')
-                query += f" ORDER BY {sort_column}"
+                # the term is a bound parameter of a lateral score, never part of
+                # the SQL text, so logs and statement stats don't see it
+                rank_sql, rank_params = "", []
+                if search:
+                    sort_mapping['relevance'] = 'score.relevance'
+
+                if sort_by not in sort_mapping:
+                    sort_by = 'code'
+                if sort_by == 'relevance':
+                    rank_sql = f" CROSS JOIN LATERAL (SELECT (-word_similarity(%s, {SEARCH_DOCUMENT}))::float8 AS relevance) score"
+                    rank_params = [search.lower()]
+                sort_column = sort_mapping[sort_by]
+                # program_code breaks ties so every row has a unique position
+                order_keys = [sort_column] if sort_by == 'code' else [sort_column, 'p.program_code']
+
+                # --------------------------------------------
+                # 3. PAGE QUERY (with the total folded in)
+                # --------------------------------------------
+                params = []
+                total_sql = ""
+                if count == 'exact':
+                    if after:
+                        total_sql = f", (SELECT COUNT(*) {from_sql}{where_sql})"
+                        params.extend(filter_params)
+                    else:
+                        total_sql = ", COUNT(*) OVER ()"
+
+                query = f"""
+                    SELECT p.program_code, p.program_name, p.college_code, c.college_name, {sort_column}{total_sql}
+                    {from_sql}{rank_sql}{where_sql}
+                """
+                params.extend(rank_params)
+                params.extend(filter_params)
+
+                if after:
+                    seek_sql, seek_params = keyset_clause(order_keys, after, sort_by)
+                    query += (" AND " if where_sql else " WHERE ") + seek_sql
+                    params.extend(seek_params)
+
+                query += " ORDER BY " + ", ".join(order_keys)
 
                 # --------------------------------------------
                 # 4. PAGINATION
                 # --------------------------------------------
-                offset = (page - 1) * per_page
-                query += " LIMIT %s OFFSET %s"
-                params.extend([per_page, offset])
+                # fetch one extra row to learn whether another page exists
+                if after:
+                    query += " LIMIT %s"
+                    params.append(per_page + 1)
+                else:
+                    offset = (page - 1) * per_page
+                    query += " LIMIT %s OFFSET %s"
+                    params.extend([per_page + 1, offset])
 
                 cursor.execute(query, params)
                 rows = cursor.fetchall()
+                has_more = len(rows) > per_page
+                rows = rows[:per_page]
+
+                total = None
+                if count == 'exact':
+                    if rows:
+                        total = rows[0][5]
+                    elif page <= 1 and not after:
+                        total = 0
+                    else:
+                        cursor.execute(f"SELECT COUNT(*) {from_sql}{where_sql}", filter_params)
+                        total = cursor.fetchone()[0]
+                elif count == 'estimate':
+                    total = estimate_count(cursor, from_sql, where_sql, filter_params)
 
                 # --------------------------------------------
                 # 5. BUILD RESPONSE
@@ -104,23 +152,24 @@ class Programs:
                         "college_name": r[3],
                     })
 
-                total_pages = (total + per_page - 1) // per_page
+                next_cursor = None
+                if has_more:
+                    last = rows[-1]
+                    next_cursor = encode_cursor(sort_by, [last[4], last[0]] if sort_by != 'code' else [last[0]])
 
                 return {
                     'items': items,
                     'total': total,
-                    'pages': total_pages,
+                    'pages': total_pages(total, per_page),
                     'page': page,
-                    'per_page': per_page
+                    'per_page': per_page,
+                    'next_cursor': next_cursor
                 }
 
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def get_by_code(program_code):
-        conn = db_pool.getconn()
-        try:
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     "SELECT program_code, program_name, college_code FROM programs WHERE program_code = %s",
@@ -130,13 +179,10 @@ class Programs:
                 if not row:
                     return None
                 return {"code": row[0], "name": row[1], "college_code": row[2]}
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def update_program(original_code, new_code, new_name, college_code):
-        conn = db_pool.getconn()
-        try:
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
@@ -148,56 +194,30 @@ class Programs:
                 )
                 updated = cursor.rowcount
                 conn.commit()
+                Dashboard.invalidate()
+                reference.invalidate()
                 return updated
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def delete(program_code):
-        conn = db_pool.getconn()
-        try:
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("DELETE FROM programs WHERE program_code = %s", (program_code,))
                 deleted = cursor.rowcount
                 conn.commit()
+                Dashboard.invalidate()
+                reference.invalidate()
                 return deleted
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def get_all_list():
-        """Return all programs as list of dicts."""
-        conn = db_pool.getconn()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    """
-                    SELECT p.program_code, p.program_name, p.college_code, c.college_name
-                    FROM programs p
-                    LEFT JOIN colleges c ON p.college_code = c.college_code
-                    ORDER BY p.program_code
-                    """
-                )
-                rows = cursor.fetchall()
-                result = []
-                for r in rows:
-                    result.append({
-                        "code": r[0],
-                        "name": r[1],
-                        "college_code": r[2],
-                        "college_name": r[3],
-                    })
-                return result
-        finally:
-            db_pool.putconn(conn)
+        """Return all programs as list of dicts, from the shared reference cache (read-only)."""
+        return reference.programs()
 
     @staticmethod
     def has_students(program_code):
-        conn = db_pool.getconn()
-        try:
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT COUNT(1) FROM students WHERE program_code = %s", (program_code,))
                 row = cursor.fetchone()
                 return bool(row and row[0])
-        finally:
-            db_pool.putconn(conn)
@@ -0,0 +1,82 @@
+"""Process-wide cache of the reference data: programs, colleges and year levels.
+
+These tables change a few times a year but are read on nearly every student
+and program request (select boxes, form validators, imports and batches).
+One snapshot of all three is loaded in a single round trip and kept for
+REFERENCE_CACHE_SECONDS. Program and college writes call `invalidate()`, so
+this worker sees them at once and other workers within the TTL.
+
+The snapshot's `version` is a hash of its contents: it is the same in every
+worker holding the same data, so it can tag responses built from it.
+"""
+import hashlib
+import json
+from app.cache import TTLCache
+from app.db import connection
+from config import REFERENCE_CACHE_SECONDS
+
+reference_cache = TTLCache(REFERENCE_CACHE_SECONDS)
+
+SNAPSHOT_QUERY = """
+    SELECT
+        (SELECT COALESCE(json_agg(json_build_array(p.program_code, p.program_name, p.college_code, c.college_name)
+                                  ORDER BY p.program_code), '[]')
+         FROM programs p
+         LEFT JOIN colleges c ON p.college_code = c.college_code),
+        (SELECT COALESCE(json_agg(json_build_array(college_code, college_name) ORDER BY college_code), '[]')
+         FROM colleges),
+        (SELECT COALESCE(json_agg(year_level ORDER BY year_level), '[]') FROM year_levels)
+"""
+
+
+class Snapshot:
+    """One consistent copy of the reference tables. Shared by every request: do not modify."""
+
+    def __init__(self, programs, colleges, year_levels):
+        self.programs = [
+            {"code": code, "name": name, "college_code": college_code, "college_name": college_name}
+            for code, name, college_code, college_name in programs
+        ]
+        self.colleges = [{"code": code, "name": name} for code, name in colleges]
+        self.year_levels = year_levels
+        self.programs_by_code = {p['code']: p for p in self.programs}
+        self.colleges_by_code = {c['code']: c for c in self.colleges}
+        content = json.dumps([programs, colleges, year_levels], separators=(',', ':'))
+        self.version = hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def snapshot():
+    return reference_cache.get(_load)
+
+
+def invalidate():
+    reference_cache.invalidate()
+
+
+def programs():
+    """All programs, ordered by code, as dicts with code, name, college_code and college_name."""
+    return snapshot().programs
+
+
+def program(code):
+    return snapshot().programs_by_code.get(code)
+
+
+def colleges():
+    """All colleges, ordered by code, as dicts with code and name."""
+    return snapshot().colleges
+
+
+def college(code):
+    return snapshot().colleges_by_code.get(code)
+
+
+def year_levels():
+    return snapshot().year_levels
+
+
+def _load():
+    with connection(readonly=True) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(SNAPSHOT_QUERY)
+            return Snapshot(*cursor.fetchone())
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from flask import has_request_context, request
+from psycopg2 import extensions
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG, SLOW_QUERY_EXPLAIN
+
+logger = logging.getLogger('app.slow_queries')
+
+# statements summarized in memory; the cheapest are dropped past this
+MAX_TRACKED = 200
+# a statement's plan is re-captured at most this often, since EXPLAIN ANALYZE runs it again
+EXPLAIN_INTERVAL_SECONDS = 300
+_READ_ONLY = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+_WRITES = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(UPDATE|SHARE)\b|nextval\(|pg_advisory', re.IGNORECASE)
+
+_lock = threading.Lock()
+_stats = {}
+_configured = False
+
+
+def init_app(app):
+    """Write slow statements as JSON lines to a rotating SLOW_QUERY_LOG file."""
+    global _configured
+    if _configured or not SLOW_QUERY_LOG:
+        return
+    directory = os.path.dirname(SLOW_QUERY_LOG)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=5 * 1024 * 1024, backupCount=5)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    _configured = True
+
+
+def is_slow(seconds):
+    return SLOW_QUERY_MS >= 0 and seconds * 1000 >= SLOW_QUERY_MS
+
+
+def record(cursor, query, params, seconds):
+    """Log and summarize one statement that ran past the threshold.
+
+    Only the shape of the parameters is kept (their types), never the values.
+    Read-only statements get an EXPLAIN (ANALYZE, BUFFERS) plan, at most once
+    per statement every EXPLAIN_INTERVAL_SECONDS.
+    """
+    sql = ' '.join(_text(cursor, query).split())
+    duration_ms = round(seconds * 1000, 2)
+    now = time.time()
+    with _lock:
+        entry = _stats.get(sql)
+        if entry is None:
+            entry = _stats[sql] = {
+                'sql': sql, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'last_seen': None, 'endpoint': None, 'plan': None, 'explained_at': 0,
+            }
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['max_ms'] = max(entry['max_ms'], duration_ms)
+        seen = entry['last_seen'] = datetime.now().isoformat(timespec='seconds')
+        endpoint = entry['endpoint'] = request.endpoint if has_request_context() else None
+        explain = SLOW_QUERY_EXPLAIN and _explainable(sql) and now - entry['explained_at'] >= EXPLAIN_INTERVAL_SECONDS
+        if explain:
+            entry['explained_at'] = now
+        if len(_stats) > MAX_TRACKED:
+            cheapest = min(_stats.values(), key=lambda e: e['total_ms'])
+            del _stats[cheapest['sql']]
+
+    plan = _explain(cursor, query, params) if explain else None
+    if plan is not None:
+        with _lock:
+            if sql in _stats:
+                _stats[sql]['plan'] = plan
+
+    logger.info(json.dumps({
+        'time': seen,
+        'duration_ms': duration_ms,
+        'endpoint': endpoint,
+        'sql': sql,
+        'params': _shape(params),
+        'plan': plan,
+    }))
+
+
+def worst_offenders(limit=50):
+    """Tracked statements, most total time first."""
+    with _lock:
+        entries = [dict(e) for e in _stats.values()]
+    for e in entries:
+        del e['explained_at']
+        e['total_ms'] = round(e['total_ms'], 2)
+        e['mean_ms'] = round(e['total_ms'] / e['count'], 2)
+    entries.sort(key=lambda e: e['total_ms'], reverse=True)
+    return entries[:limit]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def _text(cursor, query):
+    if isinstance(query, bytes):
+        return query.decode()
+    if not isinstance(query, str):
+        return query.as_string(cursor)
+    return query
+
+
+def _explainable(sql):
+    return bool(_READ_ONLY.match(sql)) and not _WRITES.search(sql)
+
+
+def _explain(cursor, query, params):
+    # a plain cursor, so the caller's results are untouched and this is not recorded again;
+    # inside a transaction a savepoint keeps a failed EXPLAIN from aborting it
+    conn = cursor.connection
+    in_transaction = conn.info.transaction_status == extensions.TRANSACTION_STATUS_INTRANS
+    with conn.cursor(cursor_factory=extensions.cursor) as explain_cursor:
+        try:
+            if in_transaction:
+                explain_cursor.execute("SAVEPOINT slow_query_explain")
+            explain_cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) " + _text(cursor, query), params)
+            plan = '\n'.join(row[0] for row in explain_cursor.fetchall())
+            if in_transaction:
+                explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        except Exception as e:
+            if in_transaction:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return f'EXPLAIN failed: {e}'
+
+
+def _shape(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
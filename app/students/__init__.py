@@ -3,4 +3,4 @@ from flask import Blueprint
 students_bp = Blueprint('students',__name__)
 
 
-from . import controller
\ No newline at end of file
+from . import controller, commands
\ No newline at end of file
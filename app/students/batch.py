@@ -0,0 +1,120 @@
+from psycopg2 import errors
+from .forms import StudentImportForm
+from .models import Students
+from ..programs.models import Programs
+
+MAX_OPERATIONS = 1000
+OPERATIONS = ('create', 'update', 'delete')
+FIELDS = ['id_number', 'first_name', 'last_name', 'program_code', 'year', 'gender']
+
+
+def run_batch(operations):
+    """Validate and apply a list of student operations in one transaction.
+
+    Each operation is {"op": "create", "data": {...}},
+    {"op": "update", "id_number": ..., "data": {...}} or
+    {"op": "delete", "id_number": ...}. Programs are loaded once for the whole
+    batch. Nothing is written unless every operation succeeds.
+    Returns (status_code, results) with one result per operation, in order.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > MAX_OPERATIONS:
+        raise ValueError(f'A batch can hold at most {MAX_OPERATIONS} operations')
+
+    program_choices = [(p['code'], p['name']) for p in Programs.get_all_list()]
+    results = []
+    creates, updates, deletes = [], [], []
+    targets, new_ids = set(), set()
+
+    for index, operation in enumerate(operations):
+        result, row = _validate(index, operation, program_choices, targets, new_ids)
+        results.append(result)
+        if row is None:
+            continue
+        if result['op'] == 'create':
+            creates.append(row)
+        elif result['op'] == 'update':
+            updates.append(row)
+        else:
+            deletes.append(row)
+
+    if any(not r['success'] for r in results):
+        for r in results:
+            if r['success']:
+                r.update(success=False, error='Not applied: another operation in the batch is invalid.')
+        return 400, results
+
+    try:
+        applied = Students.apply_batch(creates, updates, deletes)
+    except errors.UniqueViolation:
+        return 409, _fail_all(results, 'Student ID already exists')
+    except errors.ForeignKeyViolation:
+        return 400, _fail_all(results, 'Selected program does not exist.')
+
+    touched = {'create': applied['created'], 'update': applied['updated'], 'delete': applied['deleted']}
+    failed = False
+    for r in results:
+        key = r['id_number'] if r['op'] == 'create' else r['target']
+        if key not in touched[r['op']]:
+            failed = True
+            r.update(success=False, error='Student ID already exists' if r['op'] == 'create' else 'Student not found')
+    if failed:
+        for r in results:
+            if r['success']:
+                r.update(success=False, error='Not applied: another operation in the batch failed.')
+        return 409, results
+    return 200, results
+
+
+def _validate(index, operation, program_choices, targets, new_ids):
+    """Return (result, row) for one operation; row is None when it is invalid."""
+    op = operation.get('op') if isinstance(operation, dict) else None
+    result = {'index': index, 'op': op, 'success': True}
+    if op not in OPERATIONS:
+        result.update(success=False, error=f'op must be one of: {", ".join(OPERATIONS)}')
+        return result, None
+
+    target = None
+    if op != 'create':
+        target = str(operation.get('id_number') or '').strip()
+        if not target:
+            result.update(success=False, error='id_number is required')
+            return result, None
+        if target in targets:
+            result.update(success=False, error=f'Student {target} appears more than once in the batch')
+            return result, None
+        targets.add(target)
+        result['target'] = target
+
+    if op == 'delete':
+        result['id_number'] = target
+        return result, target
+
+    data = operation.get('data')
+    if not isinstance(data, dict):
+        result.update(success=False, error='data is required')
+        return result, None
+    values = {field: str(data.get(field) or '').strip() for field in FIELDS}
+    if op == 'update' and not values['id_number']:
+        values['id_number'] = target
+    result['id_number'] = values['id_number']
+
+    form = StudentImportForm(formdata=None, data=values)
+    form.program_code.choices = program_choices
+    if not form.validate():
+        result.update(success=False, error=next(iter(form.errors.values()))[0])
+        return result, None
+    if values['id_number'] in new_ids:
+        result.update(success=False, error=f"Student {values['id_number']} appears more than once in the batch")
+        return result, None
+    new_ids.add(values['id_number'])
+
+    row = tuple(values[field] for field in FIELDS)
+    return result, (target,) + row if op == 'update' else row
+
+
+def _fail_all(results, error):
+    for r in results:
+        r.update(success=False, error=error)
+    return results
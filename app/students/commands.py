@@ -0,0 +1,19 @@
+import click
+from . import students_bp
+from .importer import import_students
+
+
+@students_bp.cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_command(path):
+    """Bulk import students from a CSV or XLSX file."""
+    try:
+        with open(path, 'rb') as upload:
+            report = import_students(upload, path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    for error in report['errors']:
+        messages = '; '.join(f"{field}: {' '.join(msgs)}" for field, msgs in error['errors'].items())
+        click.echo(f"Row {error['row']} ({error['id_number'] or 'no ID'}): {messages}", err=True)
+    click.echo(f"Imported {report['imported']} of {report['total_rows']} rows ({report['skipped']} skipped).")
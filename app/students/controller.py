@@ -1,14 +1,25 @@
 from . import students_bp
-from flask import render_template, request, jsonify, session, redirect, url_for, flash
-from .forms import StudentForm
+from flask import render_template, request, jsonify, session, redirect, url_for, flash, Response, stream_with_context, current_app
+from psycopg2 import errors
+from .forms import StudentForm, StudentApiForm
 from .models import Students
+from .importer import import_students
+from .exporter import export_students, EXPORT_FORMATS
+from .batch import run_batch
+from app import reference
+from app.pagination import COUNT_MODES
 from ..programs.models import Programs
+import re
+import uuid
 from config import SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_BUCKET_NAME, MAX_FILE_SIZE
 from supabase import create_client, Client
+from app.metrics import timed_bucket
 
 
 supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 
+PICTURE_EXTENSIONS = ['png', 'jpg', 'jpeg', 'gif']
+
 @students_bp.route('/students')
 def students_list():
     if 'user_id' not in session:
@@ -16,7 +27,7 @@ def students_list():
 
     # Get search, sort, pagination, and filter parameters
     search = request.args.get('q', '')
-    sort_by = request.args.get('sort', 'id')
+    sort_by = request.args.get('sort') or ('relevance' if search else 'id')
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
     program_code_filter = request.args.get('program_code', '')
@@ -115,13 +126,12 @@ def add_student():
             year=form.year.data,
             gender=form.gender.data
         )
-        print("Form validated successfully, adding student:", student.__dict__)
+        current_app.logger.debug("Adding student %s", student.id_number)
         student.add()
         flash('Student added successfully!', 'success')
         return redirect(url_for('students.students_list'))
     else:
-        print("Form validation failed. Errors:", form.errors)
-        print("Form data:", {field.name: field.data for field in form if field.name != 'csrf_token'})
+        current_app.logger.debug("Student form validation failed: %s", form.errors)
     
     return jsonify({'success': False, 'errors': form.errors}) if request.headers.get('X-Requested-With') == 'XMLHttpRequest' else render_template(
         'students.html',
@@ -139,9 +149,14 @@ def next_id_for_year(year):
     """Return next student id for the requested year in JSON (e.g. 2025-0001)."""
     if 'user_id' not in session:
         return jsonify({'error': 'unauthorized'}), 401
+    if not re.fullmatch(r'\d{4}', year):
+        return jsonify({'error': 'Year must be four digits, e.g. 2025.'}), 400
     try:
         next_id = Students.get_next_id(year=year)
         return jsonify({'next_id': next_id})
+    except ValueError as e:
+        # every YEAR-NNNN for this year is in use
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -288,12 +303,18 @@ def api_list_students():
     try:
         # Get search, sort, pagination, and filter parameters
         search = request.args.get('q', '')
-        sort_by = request.args.get('sort', 'id')
+        sort_by = request.args.get('sort') or ('relevance' if search else 'id')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         program_code_filter = request.args.get('program_code', '')
         year_filter = request.args.get('year', '')
         gender_filter = request.args.get('gender', '')
+        # opaque cursor from a previous response's next_cursor (keyset paging)
+        after = request.args.get('after', '')
+        # exact | estimate | none - how the total is computed
+        count = request.args.get('count', 'exact')
+        if count not in COUNT_MODES:
+            return jsonify({'success': False, 'error': f'count must be one of: {", ".join(COUNT_MODES)}'}), 400
 
         # Get paginated students data with filters
         students_data = Students.get_all(
@@ -303,17 +324,93 @@ def api_list_students():
             per_page=per_page,
             program_code_filter=program_code_filter if program_code_filter else None,
             year_filter=year_filter if year_filter else None,
-            gender_filter=gender_filter if gender_filter else None
+            gender_filter=gender_filter if gender_filter else None,
+            after=after if after else None,
+            count=count
         )
 
         return jsonify({
             'success': True,
             'data': students_data
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@students_bp.route('/api/students/import', methods=['POST'])
+def api_import_students():
+    """API endpoint to bulk import students from an uploaded CSV or XLSX file."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+
+    try:
+        report = import_students(upload.stream, upload.filename)
+        return jsonify({
+            'success': True,
+            'message': f"Imported {report['imported']} of {report['total_rows']} rows",
+            'data': report
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@students_bp.route('/api/students/batch', methods=['POST'])
+def api_batch_students():
+    """API endpoint to create, update and delete many students in one transaction."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True)
+    if not data or 'operations' not in data:
+        return jsonify({'success': False, 'error': 'Missing required field: operations'}), 400
+
+    try:
+        status, results = run_batch(data['operations'])
+        applied = status == 200
+        return jsonify({
+            'success': applied,
+            'message': f'Applied {len(results)} operations' if applied else 'No changes were applied',
+            'data': results
+        }), status
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@students_bp.route('/api/students/export', methods=['GET'])
+def api_export_students():
+    """API endpoint to stream the filtered student list as CSV or NDJSON."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+
+    chunks = export_students(
+        fmt,
+        search=request.args.get('q') or None,
+        program_code_filter=request.args.get('program_code') or None,
+        year_filter=request.args.get('year') or None,
+        gender_filter=request.args.get('gender') or None
+    )
+    # stream_with_context keeps the request's pooled connection until the last chunk is sent
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=students.{fmt}'}
+    )
+
+
 @students_bp.route('/api/students/<id_number>', methods=['GET'])
 def api_get_student(id_number):
     """API endpoint to get a single student by ID."""
@@ -368,15 +465,8 @@ def api_create_student():
         if not all([id_number, first_name, last_name, program_code, gender]) or year is None:
             return jsonify({'success': False, 'error': 'All fields must be non-empty'}), 400
 
-        # Check if student already exists
-        existing = Students.get_by_id(id_number)
-        if existing:
-            return jsonify({'success': False, 'error': 'Student ID already exists'}), 409
-
-        # prepare add/edit form and program choices so modal options are available on page load
-        form = StudentForm()
-        programs = Programs.get_all_list()
-        form.program_code.choices = [(p['code'], f"{p['code']} - {p['name']}") for p in programs]
+        # duplicates and unknown programs are caught by the insert itself
+        form = StudentApiForm()
 
         if not form.validate():
             first_error = next(iter(form.errors.values()))[0]
@@ -385,43 +475,10 @@ def api_create_student():
                 'error': first_error
             }), 400
 
-        # Handle profile picture upload
-        file_link = None
-        if profile_picture and profile_picture.filename:
-            # Validate file type
-            allowed_extensions = {'png', 'jpg', 'jpeg', 'gif'}
-            if '.' not in profile_picture.filename or profile_picture.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
-                return jsonify({'success': False, 'error': 'Invalid file type. Only PNG, JPG, JPEG, GIF allowed.'}), 400
-
-            # Validate file size
-            profile_picture.seek(0, 2)
-            file_size = profile_picture.tell() 
-            profile_picture.seek(0)  
-            
-            if file_size > MAX_FILE_SIZE:
-                max_size_mb = MAX_FILE_SIZE / (1024 * 1024)
-                return jsonify({'success': False, 'error': f'File size too large. Maximum allowed size is {max_size_mb:.1f}MB.'}), 400
-
-            # Upload to Supabase - rename file to student ID
-            file_extension = profile_picture.filename.rsplit('.', 1)[1].lower()
-            filename = f"{id_number}.{file_extension}"
-            file_path = f"students/{filename}"
-
-            try:
-                file_bytes = profile_picture.read()
-                content_type = profile_picture.mimetype
-                upload_response = supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
-                    path=file_path,
-                    file=file_bytes,
-                    file_options={"content-type": content_type}
-                )
-
-
-                print(upload_response)
-                # Get public URL
-                file_link = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(file_path)
-            except Exception as upload_error:
-                return jsonify({'success': False, 'error': f'File upload failed: {str(upload_error)}'}), 500
+        # Check the picture now, but upload it only once the ID is ours
+        picture_error = _picture_error(profile_picture)
+        if picture_error:
+            return jsonify({'success': False, 'error': picture_error}), 400
 
         # Create new student
         student = Students(
@@ -430,10 +487,34 @@ def api_create_student():
             last_name=last_name,
             program_code=program_code,
             year=year,
-            gender=gender,
-            file_link=file_link
+            gender=gender
         )
-        student.add()
+        try:
+            created = student.add()
+        except errors.ForeignKeyViolation:
+            return jsonify({'success': False, 'error': 'Selected program does not exist.'}), 400
+        if not created:
+            return jsonify({'success': False, 'error': 'Student ID already exists'}), 409
+
+        file_link = None
+        if profile_picture and profile_picture.filename:
+            file_extension = profile_picture.filename.rsplit('.', 1)[1].lower()
+            file_path = f"students/{id_number}.{file_extension}"
+            try:
+                # the ID was free, so anything already at this path is an orphan
+                upload_response = timed_bucket(supabase, SUPABASE_BUCKET_NAME).upload(
+                    path=file_path,
+                    file=profile_picture.read(),
+                    file_options={"content-type": profile_picture.mimetype, "upsert": "true"}
+                )
+                current_app.logger.debug("Uploaded %s: %s", file_path, upload_response)
+                file_link = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(file_path)
+                Students.set_file_link(id_number, file_link)
+            except Exception as upload_error:
+                # keep the create all-or-nothing
+                Students.delete(id_number)
+                _remove_files([file_path])
+                return jsonify({'success': False, 'error': f'File upload failed: {str(upload_error)}'}), 500
 
         return jsonify({
             'success': True,
@@ -489,10 +570,8 @@ def api_update_student(id_number):
         if not all([first_name, last_name, program_code, gender]) or year is None:
             return jsonify({'success': False, 'error': 'All fields must be non-empty'}), 400
 
-        # prepare add/edit form and program choices so modal options are available on page load
-        form = StudentForm()
-        programs = Programs.get_all_list()
-        form.program_code.choices = [(p['code'], f"{p['code']} - {p['name']}") for p in programs]
+        # a taken new ID and unknown programs are caught by the update itself
+        form = StudentApiForm()
 
         if not form.validate():
             first_error = next(iter(form.errors.values()))[0]
@@ -501,90 +580,74 @@ def api_update_student(id_number):
                 'error': first_error
             }), 400
 
-        # Check if target ID already exists (if changing ID)
-        if new_id != id_number:
-            existing = Students.get_by_id(new_id)
-            if existing:
-                return jsonify({'success': False, 'error': 'Student ID already exists'}), 409
-
         # Validate year
-        if year not in ['1st Year', '2nd Year', '3rd Year', '4th Year', '5th Year']:
-            return jsonify({'success': False, 'error': 'Year must be one of: 1st Year, 2nd Year, 3rd Year, 4th Year, 5th Year'}), 400
-
-        print(profile_picture)
-        # Handle profile picture upload or clearing
-        file_link = None
-        if clear_picture:
-            # Delete existing file from Supabase if it exists
-            try:
-                existing_student = Students.get_by_id(id_number)
-                if existing_student and existing_student.get('file_link'):
-                    # Try to delete possible extensions
-                    for ext in ['png', 'jpg', 'jpeg', 'gif']:
-                        try:
-                            supabase.storage.from_(SUPABASE_BUCKET_NAME).remove([f"students/{id_number}.{ext}"])
-                        except:
-                            pass  # File might not exist with this extension
-            except Exception as e:
-                print(f"Error deleting old file: {e}")
-            # file_link remains None for clearing
-        elif profile_picture and profile_picture.filename:
-            # Validate file type
-            allowed_extensions = {'png', 'jpg', 'jpeg', 'gif'}
-            if '.' not in profile_picture.filename or profile_picture.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
-                return jsonify({'success': False, 'error': 'Invalid file type. Only PNG, JPG, JPEG, GIF allowed.'}), 400
-
-            # Validate file size
-            profile_picture.seek(0, 2)
-            file_size = profile_picture.tell()
-            profile_picture.seek(0)
-            
-            if file_size > MAX_FILE_SIZE:
-                max_size_mb = MAX_FILE_SIZE / (1024 * 1024)
-                return jsonify({'success': False, 'error': f'File size too large. Maximum allowed size is {max_size_mb:.1f}MB.'}), 400
-
-            # Upload to Supabase - rename file to student ID
+        year_levels = reference.year_levels()
+        if year not in year_levels:
+            return jsonify({'success': False, 'error': f"Year must be one of: {', '.join(year_levels)}"}), 400
+
+        # A new picture goes to a temporary key first; the student's current
+        # files are only touched once the update has gone through.
+        picture_error = None if clear_picture else _picture_error(profile_picture)
+        if picture_error:
+            return jsonify({'success': False, 'error': picture_error}), 400
+
+        file_link = None  # remains None for clearing
+        temp_path = final_path = None
+        if not clear_picture and profile_picture and profile_picture.filename:
             file_extension = profile_picture.filename.rsplit('.', 1)[1].lower()
-            filename = f"{new_id}.{file_extension}"
-            file_path = f"students/{filename}"
-
+            temp_path = f"students/tmp-{uuid.uuid4().hex}.{file_extension}"
+            final_path = f"students/{new_id}.{file_extension}"
             try:
-                # Delete old file if exists
-                try:
-                    supabase.storage.from_(SUPABASE_BUCKET_NAME).remove([f"students/{id_number}.{file_extension}"])
-                except:
-                    pass  # Old file might not exist or different extension
-
-                file_bytes = profile_picture.read()
-                content_type = profile_picture.mimetype
-                upload_response = supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
-                    path=file_path,
-                    file=file_bytes,
-                    file_options={"content-type": content_type}
+                upload_response = timed_bucket(supabase, SUPABASE_BUCKET_NAME).upload(
+                    path=temp_path,
+                    file=profile_picture.read(),
+                    file_options={"content-type": profile_picture.mimetype}
                 )
-
-
-                print(upload_response)
-                # Get public URL
-                file_link = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(file_path)
+                current_app.logger.debug("Uploaded %s: %s", temp_path, upload_response)
             except Exception as upload_error:
                 return jsonify({'success': False, 'error': f'File upload failed: {str(upload_error)}'}), 500
+            file_link = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(final_path)
 
         # Update student
-        updated = Students.update(
-            original_id=id_number,
-            new_id=new_id,
-            first_name=first_name,
-            last_name=last_name,
-            program_code=program_code,
-            year=year,
-            gender=gender,
-            file_link=file_link,
-            clear_picture=clear_picture
-        )
-        if updated == 0:
+        try:
+            previous = Students.update(
+                original_id=id_number,
+                new_id=new_id,
+                first_name=first_name,
+                last_name=last_name,
+                program_code=program_code,
+                year=year,
+                gender=gender,
+                file_link=file_link,
+                clear_picture=clear_picture
+            )
+        except errors.UniqueViolation:
+            _remove_files([temp_path])
+            return jsonify({'success': False, 'error': 'Student ID already exists'}), 409
+        except errors.ForeignKeyViolation:
+            _remove_files([temp_path])
+            return jsonify({'success': False, 'error': 'Selected program does not exist.'}), 400
+        except Exception:
+            _remove_files([temp_path])
+            raise
+        if previous is None:
+            _remove_files([temp_path])
             return jsonify({'success': False, 'error': 'Student not found'}), 404
 
+        if temp_path:
+            # replace the old picture (any extension) and free the final path for the move
+            _remove_files(_picture_paths(id_number) + ([] if new_id == id_number else _picture_paths(new_id)))
+            try:
+                timed_bucket(supabase, SUPABASE_BUCKET_NAME).move(temp_path, final_path)
+            except Exception as move_error:
+                # don't leave the record pointing at a file that is not there
+                _remove_files([temp_path])
+                Students.set_file_link(new_id, None)
+                return jsonify({'success': False, 'error': f'File upload failed: {str(move_error)}'}), 500
+        elif clear_picture and previous['file_link']:
+            # Delete existing file from Supabase; try the possible extensions
+            _remove_files(_picture_paths(id_number))
+
         return jsonify({
             'success': True,
             'message': 'Student updated successfully',
@@ -624,15 +687,63 @@ def api_delete_student(id_number):
 
 @students_bp.route('/api/students/next-id/<year>', methods=['GET'])
 def api_next_id_for_year(year):
-    """API endpoint to get next student ID for the requested year."""
+    """API endpoint to get next student ID for the requested year.
+
+    With ?reserve=1 the ID is held for this user until it is used or the
+    reservation expires, so concurrent add forms never get the same ID.
+    Reserving again renews the user's existing hold instead of taking another.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
+    if not re.fullmatch(r'\d{4}', year):
+        return jsonify({'success': False, 'error': 'Year must be four digits, e.g. 2025.'}), 400
+
     try:
+        if request.args.get('reserve') in ('1', 'true'):
+            next_id, expires_at = Students.reserve_next_id(session['user_id'], year=year)
+            return jsonify({
+                'success': True,
+                'data': {'next_id': next_id, 'reserved_until': expires_at.isoformat()}
+            })
+
         next_id = Students.get_next_id(year=year)
         return jsonify({
             'success': True,
             'data': {'next_id': next_id}
         })
+    except ValueError as e:
+        # every YEAR-NNNN for this year is in use
+        return jsonify({'success': False, 'error': str(e)}), 409
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def _picture_error(profile_picture):
+    """Why an uploaded picture is unacceptable, or None."""
+    if not (profile_picture and profile_picture.filename):
+        return None
+    if '.' not in profile_picture.filename or profile_picture.filename.rsplit('.', 1)[1].lower() not in PICTURE_EXTENSIONS:
+        return 'Invalid file type. Only PNG, JPG, JPEG, GIF allowed.'
+    profile_picture.seek(0, 2)
+    file_size = profile_picture.tell()
+    profile_picture.seek(0)
+    if file_size > MAX_FILE_SIZE:
+        max_size_mb = MAX_FILE_SIZE / (1024 * 1024)
+        return f'File size too large. Maximum allowed size is {max_size_mb:.1f}MB.'
+    return None
+
+
+def _picture_paths(id_number):
+    return [f"students/{id_number}.{ext}" for ext in PICTURE_EXTENSIONS]
+
+
+def _remove_files(paths):
+    """Best-effort delete of storage paths; missing files are not an error."""
+    paths = [path for path in paths if path]
+    if not paths:
+        return
+    try:
+        timed_bucket(supabase, SUPABASE_BUCKET_NAME).remove(paths)
+    except Exception as e:
+        current_app.logger.warning("Error removing files %s: %s", paths, e)
@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from .models import Students
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+COLUMNS = [
+    'id_number', 'first_name', 'last_name', 'program_code', 'program_name',
+    'college_name', 'year', 'gender', 'date_registered', 'file_link'
+]
+# flush a chunk to the client once this many characters are buffered
+CHUNK_SIZE = 64 * 1024
+
+
+def export_students(fmt, **filters):
+    """Yield the filtered student list as CSV or NDJSON text chunks.
+
+    Rows are read through Students.iter_export's server-side cursor and
+    written out as they arrive, so memory stays flat however many match.
+    """
+    rows = Students.iter_export(**filters)
+    if fmt == 'csv':
+        return _csv_chunks(rows)
+    if fmt == 'ndjson':
+        return _ndjson_chunks(rows)
+    raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+
+def _value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow([_value(row[column]) for column in COLUMNS])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps({column: row[column] for column in COLUMNS}, default=_value) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
@@ -2,12 +2,13 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, SelectField, SubmitField, HiddenField
 from wtforms.validators import DataRequired, Length, Regexp, ValidationError, Optional
+from app import reference
 from config import MAX_FILE_SIZE
 
 
 def validate_program_code(form, field):
-    from ..programs.models import Programs
-    if not Programs.get_by_code(field.data):
+    # the cache may trail another worker's edit briefly; the foreign key still guards the write
+    if reference.program(field.data) is None:
         raise ValidationError('Selected program does not exist.')
 
 
@@ -63,3 +64,25 @@ class StudentForm(FlaskForm):
         FileAllowed(['png', 'jpg', 'jpeg', 'gif'], 'Images only!'),
         validate_file_size
     ])
+
+
+class StudentImportForm(StudentForm):
+    """StudentForm rules for one spreadsheet row.
+
+    Program codes are checked against choices loaded once per import rather
+    than a lookup per row, and there is no CSRF token or picture upload.
+    """
+    class Meta:
+        csrf = False
+
+    program_code = SelectField("Program", choices=[], validators=[DataRequired()])
+    profile_picture = None
+
+
+class StudentApiForm(StudentForm):
+    """StudentForm for the JSON API writes.
+
+    The program is not looked up before saving: the insert or update itself
+    fails on the program_code foreign key, which the API reports as a 400.
+    """
+    program_code = StringField("Program", validators=[DataRequired(), Length(max=20)])
@@ -0,0 +1,110 @@
+import csv
+import io
+from .forms import StudentImportForm
+from .models import Students
+from ..programs.models import Programs
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # in requirements; without it only CSV imports work
+    load_workbook = None
+
+BATCH_SIZE = 1000
+COLUMNS = ['id_number', 'first_name', 'last_name', 'program_code', 'year', 'gender']
+# spreadsheet headers that mean the same column
+HEADER_ALIASES = {'id': 'id_number', 'year_level': 'year', 'program': 'program_code'}
+
+
+def import_students(stream, filename):
+    """Validate and load a CSV or XLSX file of students.
+
+    Rows are read lazily, validated against the StudentForm rules in batches
+    of BATCH_SIZE, and every valid row is loaded in one COPY transaction.
+    Returns a report with per-row errors; row numbers count the header as 1.
+    """
+    if filename.lower().endswith('.xlsx'):
+        rows = _read_xlsx(stream)
+    elif filename.lower().endswith('.csv'):
+        rows = _read_csv(stream)
+    else:
+        raise ValueError('Unsupported file type. Upload a .csv or .xlsx file.')
+
+    # one program lookup per import instead of one per row
+    program_choices = [(p['code'], p['name']) for p in Programs.get_all_list()]
+    report = {'total_rows': 0, 'imported': 0, 'skipped': 0, 'errors': []}
+    row_numbers = {}
+
+    def valid_batches():
+        batch = []
+        for row_number, row in rows:
+            report['total_rows'] += 1
+            data = {column: _clean(row.get(column)) for column in COLUMNS}
+            form = StudentImportForm(formdata=None, data=data)
+            form.program_code.choices = program_choices
+            if not form.validate():
+                report['errors'].append({'row': row_number, 'id_number': data['id_number'], 'errors': form.errors})
+                continue
+            if data['id_number'] in row_numbers:
+                report['errors'].append({
+                    'row': row_number,
+                    'id_number': data['id_number'],
+                    'errors': {'id_number': [f"Duplicate of row {row_numbers[data['id_number']]}."]}
+                })
+                continue
+            row_numbers[data['id_number']] = row_number
+            batch.append(tuple(data[column] for column in COLUMNS))
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    inserted = Students.import_rows(valid_batches())
+
+    for id_number, row_number in row_numbers.items():
+        if id_number not in inserted:
+            report['errors'].append({'row': row_number, 'id_number': id_number, 'errors': {'id_number': ['Student ID already exists.']}})
+    report['imported'] = len(inserted)
+    report['skipped'] = report['total_rows'] - len(inserted)
+    report['errors'].sort(key=lambda e: e['row'])
+    return report
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _header(names):
+    normalized = [str(n or '').strip().lower().replace(' ', '_') for n in names]
+    header = [HEADER_ALIASES.get(n, n) for n in normalized]
+    missing = [c for c in COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return header
+
+
+def _read_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = _header(next(reader, []))
+    for row_number, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield row_number, dict(zip(header, values))
+
+
+def _read_xlsx(stream):
+    if load_workbook is None:
+        raise ValueError('XLSX import requires the openpyxl package. Upload a .csv file instead.')
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        sheet_rows = workbook.active.iter_rows(values_only=True)
+        header = _header(next(sheet_rows, []))
+        for row_number, values in enumerate(sheet_rows, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield row_number, dict(zip(header, values))
+    finally:
+        workbook.close()
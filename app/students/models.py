@@ -1,5 +1,96 @@
-from app import db_pool
+import csv
+import io
+import re
+from psycopg2.extras import execute_values
+from app.db import connection
+from app.dashboard.models import Dashboard
+from app.pagination import COUNT_MODES, encode_cursor, estimate_count, keyset_clause, total_pages
 from datetime import datetime
+from config import STUDENT_ID_RESERVATION_MINUTES
+
+# IDs are YEAR-NNNN (StudentForm enforces it), so a year holds at most this many
+MAX_ID_SUFFIX = 9999
+
+# First free sequence number for a year, counting both enrolled students and
+# unexpired reservations. The LIKE prefix is served by idx_students_id_pattern.
+# Suffixes that are not four digits cannot be valid IDs and are ignored.
+NEXT_ID_QUERY = """
+    WITH taken AS (
+        SELECT CAST(SUBSTRING(id_number FROM %(suffix_start)s) AS BIGINT) AS n
+        FROM students
+        WHERE id_number LIKE %(prefix)s AND SUBSTRING(id_number FROM %(suffix_start)s) ~ '^[0-9]{4}$'
+        UNION
+        SELECT CAST(SUBSTRING(id_number FROM %(suffix_start)s) AS BIGINT)
+        FROM student_id_reservations
+        WHERE id_number LIKE %(prefix)s AND expires_at > CURRENT_TIMESTAMP
+            AND SUBSTRING(id_number FROM %(suffix_start)s) ~ '^[0-9]{4}$'
+    ),
+    ranked AS (
+        SELECT n, ROW_NUMBER() OVER (ORDER BY n) AS rn FROM taken WHERE n >= 1
+    )
+    SELECT COALESCE(
+        (SELECT MIN(rn) FROM ranked WHERE n <> rn),
+        (SELECT COUNT(*) FROM ranked) + 1
+    ) AS next_num
+"""
+
+
+def _next_id_params(year):
+    # the year goes into a LIKE prefix and the ID itself: digits only
+    if not re.fullmatch(r'\d{4}', year):
+        raise ValueError('Year must be four digits, e.g. 2025.')
+    return {'year': year, 'prefix': f"{year}-%", 'suffix_start': len(year) + 2}
+
+
+def _ids_exhausted(year):
+    return ValueError(f'All {MAX_ID_SUFFIX} student IDs for {year} are taken or reserved.')
+
+
+# Text searched by the students list. Must stay identical to the expression
+# behind idx_students_search_trgm in db_init so the trigram index is used.
+SEARCH_DOCUMENT = (
+    "LOWER(s.id_number || ' ' || s.first_name || ' ' || s.last_name || ' ' || "
+    "COALESCE(s.program_code, '') || ' ' || COALESCE(s.year_level, '') || ' ' || COALESCE(s.gender, ''))"
+)
+
+
+LIST_FROM = """
+    FROM students s
+    LEFT JOIN programs p ON s.program_code = p.program_code
+    LEFT JOIN colleges c ON p.college_code = c.college_code
+"""
+
+
+def _list_filters(search, program_code_filter, year_filter, gender_filter):
+    """Return (where_clauses, params) shared by the list and export queries."""
+    params = []
+    where_clauses = []
+
+    if search:
+        # Both arms are index-backed: the trigram GIN index on the
+        # search document, and program_code = ANY(...) on the
+        # programs whose name matches (resolved once up front).
+        where_clauses.append(f"""
+            ({SEARCH_DOCUMENT} LIKE %s
+            OR s.program_code = ANY(ARRAY(
+                SELECT program_code FROM programs WHERE LOWER(program_name) LIKE %s)))
+        """)
+        search_term = f"%{search.lower()}%"
+        params.extend([search_term, search_term])
+
+    if program_code_filter:
+        where_clauses.append("s.program_code = %s")
+        params.append(program_code_filter)
+
+    if year_filter:
+        where_clauses.append("s.year_level = %s")
+        params.append(year_filter)
+
+    if gender_filter:
+        where_clauses.append("s.gender = %s")
+        params.append(gender_filter)
+
+    return where_clauses, params
 
 
 class Students:
@@ -14,165 +105,342 @@ class Students:
         self.clear_picture = clear_picture
 
     def add(self):
-        conn = db_pool.getconn()
-        try:
+        """Insert the student; returns False if the ID is already taken.
+
+        One statement: the ID's reservation is released in the same round trip,
+        and a taken ID is reported through ON CONFLICT rather than a lookup first.
+        A program that does not exist raises ForeignKeyViolation.
+        """
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
+                    WITH released AS (
+                        DELETE FROM student_id_reservations WHERE id_number = %s
+                    )
                     INSERT INTO students (id_number, first_name, last_name, program_code, year_level, gender, date_registered, file_link)
                     VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, %s)
                     ON CONFLICT (id_number) DO NOTHING
+                    RETURNING id_number
                     """,
-                    (self.id_number, self.first_name, self.last_name, self.program_code, self.year, self.gender, self.file_link)
+                    (self.id_number, self.id_number, self.first_name, self.last_name, self.program_code, self.year, self.gender, self.file_link)
                 )
+                created = cursor.fetchone() is not None
                 conn.commit()
-        finally:
-            db_pool.putconn(conn)
+                Dashboard.invalidate()
+                return created
+
+    @staticmethod
+    def import_rows(batches):
+        """Load batches of already-validated rows in a single transaction.
+
+        Each batch is a list of (id_number, first_name, last_name,
+        program_code, year, gender) tuples. Batches are streamed with COPY
+        into a temporary staging table, then moved into students with one
+        INSERT ... SELECT; IDs that already exist are skipped. Returns the set
+        of inserted IDs.
+        """
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    CREATE TEMP TABLE students_import (
+                        id_number VARCHAR(15),
+                        first_name VARCHAR(50),
+                        last_name VARCHAR(50),
+                        program_code VARCHAR(20),
+                        year_level VARCHAR(20),
+                        gender VARCHAR(10)
+                    ) ON COMMIT DROP
+                    """
+                )
+                for batch in batches:
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    buffer.seek(0)
+                    cursor.copy_expert("COPY students_import FROM STDIN WITH (FORMAT csv)", buffer)
+
+                cursor.execute(
+                    """
+                    INSERT INTO students (id_number, first_name, last_name, program_code, year_level, gender, date_registered)
+                    SELECT id_number, first_name, last_name, program_code, year_level, gender, CURRENT_TIMESTAMP
+                    FROM students_import
+                    ON CONFLICT (id_number) DO NOTHING
+                    RETURNING id_number
+                    """
+                )
+                inserted = {r[0] for r in cursor.fetchall()}
+                cursor.execute(
+                    "DELETE FROM student_id_reservations r USING students_import i WHERE r.id_number = i.id_number"
+                )
+                conn.commit()
+                Dashboard.invalidate()
+                return inserted
+
+    @staticmethod
+    def apply_batch(creates=(), updates=(), deletes=()):
+        """Apply many writes in one transaction, all or nothing.
+
+        `creates` are (id_number, first_name, last_name, program_code, year, gender)
+        tuples, `updates` the same prefixed with the original ID, and `deletes`
+        plain IDs. Deletes run first, then updates, then creates, each as a single
+        statement. Returns the sets of IDs each step touched; if any requested row
+        was missing (or a create hit an existing ID) the transaction is rolled back.
+        """
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                deleted = set()
+                if deletes:
+                    cursor.execute(
+                        "DELETE FROM students WHERE id_number = ANY(%s) RETURNING id_number",
+                        (list(deletes),)
+                    )
+                    deleted = {r[0] for r in cursor.fetchall()}
+
+                updated = set()
+                if updates:
+                    rows = execute_values(
+                        cursor,
+                        """
+                        UPDATE students s
+                        SET id_number = v.id_number, first_name = v.first_name, last_name = v.last_name,
+                            program_code = v.program_code, year_level = v.year_level, gender = v.gender
+                        FROM (VALUES %s) AS v(original_id, id_number, first_name, last_name, program_code, year_level, gender)
+                        WHERE s.id_number = v.original_id
+                        RETURNING v.original_id
+                        """,
+                        list(updates),
+                        page_size=len(updates),
+                        fetch=True
+                    )
+                    updated = {r[0] for r in rows}
+
+                created = set()
+                if creates:
+                    rows = execute_values(
+                        cursor,
+                        """
+                        INSERT INTO students (id_number, first_name, last_name, program_code, year_level, gender)
+                        VALUES %s
+                        ON CONFLICT (id_number) DO NOTHING
+                        RETURNING id_number
+                        """,
+                        list(creates),
+                        page_size=len(creates),
+                        fetch=True
+                    )
+                    created = {r[0] for r in rows}
+                    cursor.execute(
+                        "DELETE FROM student_id_reservations WHERE id_number = ANY(%s)",
+                        ([c[0] for c in creates],)
+                    )
+
+                if len(deleted) == len(deletes) and len(updated) == len(updates) and len(created) == len(creates):
+                    conn.commit()
+                    Dashboard.invalidate()
+                else:
+                    conn.rollback()
+                return {'created': created, 'updated': updated, 'deleted': deleted}
 
     @staticmethod
     def get_next_id(year=None):
         """Return the next available student ID in the format YEAR-0001.
 
-        If `year` is None, uses the current year. Only existing IDs for the
-        given year are considered when filling gaps.
+        If `year` is None, uses the current year. Existing IDs and unexpired
+        reservations for the given year are considered when filling gaps.
+        This only peeks; use reserve_next_id() to hold the ID for a clerk.
+        Raises ValueError when every ID for the year is taken.
         """
         if year is None:
             year = datetime.now().year
         year = str(year)
-        like_pattern = f"{year}-%"
 
-        conn = db_pool.getconn()
-        try:
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT id_number FROM students WHERE id_number LIKE %s", (like_pattern,))
-                rows = cursor.fetchall()
-                nums = []
-                for r in rows:
-                    val = r[0]
-                    if not val or '-' not in val:
-                        continue
-                    parts = val.split('-', 1)
-                    if parts[0] != year:
-                        continue
-                    suffix = parts[1]
-                    try:
-                        nums.append(int(suffix))
-                    except Exception:
-                        continue
-
-                if not nums:
-                    next_num = 1
-                else:
-                    nums = sorted(set(nums))
-                    expected = 1
-                    for n in nums:
-                        if n > expected:
-                            next_num = expected
-                            break
-                        if n == expected:
-                            expected += 1
-                    else:
-                        next_num = expected
+                cursor.execute(NEXT_ID_QUERY, _next_id_params(year))
+                next_num = cursor.fetchone()[0]
+        if next_num > MAX_ID_SUFFIX:
+            raise _ids_exhausted(year)
+        return f"{year}-{next_num:04d}"
 
-                return f"{year}-{next_num:04d}"
-        finally:
-            db_pool.putconn(conn)
+    @staticmethod
+    def reserve_next_id(holder, year=None, minutes=STUDENT_ID_RESERVATION_MINUTES):
+        """Hand out the next available ID to `holder` and hold it for `minutes`.
+
+        A per-year advisory lock serializes allocation, so two clerks opening
+        the add form at the same moment never receive the same ID. A holder
+        keeps one ID at a time: asking again for the same year renews the hold
+        it already has, and asking for another year releases it. The
+        reservation is also released when the student is added or when it
+        expires. Returns (id_number, expires_at); raises ValueError when every
+        ID for the year is taken.
+        """
+        if year is None:
+            year = datetime.now().year
+        year = str(year)
+        params = _next_id_params(year)
+
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                # one round trip: lock, purge expired holds and the holder's other
+                # years, then renew the holder's hold or find the gap and hold it
+                cursor.execute(
+                    f"""
+                    SELECT pg_advisory_xact_lock(hashtext('student_id:' || %(year)s));
+                    DELETE FROM student_id_reservations
+                    WHERE (id_number LIKE %(prefix)s AND expires_at <= CURRENT_TIMESTAMP)
+                       OR (holder = %(holder)s AND id_number NOT LIKE %(prefix)s);
+                    WITH kept AS (
+                        UPDATE student_id_reservations
+                        SET expires_at = CURRENT_TIMESTAMP + make_interval(mins => %(minutes)s)
+                        WHERE holder = %(holder)s AND id_number LIKE %(prefix)s
+                        RETURNING id_number, expires_at
+                    ),
+                    next_id AS ({NEXT_ID_QUERY}),
+                    held AS (
+                        INSERT INTO student_id_reservations (id_number, expires_at, holder)
+                        SELECT %(year)s || '-' || LPAD(next_num::text, 4, '0'),
+                               CURRENT_TIMESTAMP + make_interval(mins => %(minutes)s), %(holder)s
+                        FROM next_id
+                        WHERE NOT EXISTS (SELECT 1 FROM kept) AND next_num <= %(max_suffix)s
+                        RETURNING id_number, expires_at
+                    )
+                    SELECT id_number, expires_at FROM kept
+                    UNION ALL
+                    SELECT id_number, expires_at FROM held
+                    """,
+                    dict(params, minutes=minutes, holder=str(holder), max_suffix=MAX_ID_SUFFIX)
+                )
+                row = cursor.fetchone()
+                conn.commit()
+        if row is None:
+            raise _ids_exhausted(year)
+        return row[0], row[1]
 
     @staticmethod
-    def get_all(search=None, sort_by=None, page=1, per_page=10, program_code_filter=None, year_filter=None, gender_filter=None):
-        """Return paginated students with program details joined."""
-        conn = db_pool.getconn()
-        try:
+    def get_all(search=None, sort_by=None, page=1, per_page=10, program_code_filter=None, year_filter=None, gender_filter=None, after=None, count='exact'):
+        """Return paginated students with program details joined.
+
+        Pass the previous response's `next_cursor` as `after` to seek past it
+        instead of using OFFSET, so deep pages cost the same as the first.
+
+        `count` picks how `total` is produced: 'exact' folds a window count
+        into the page query, 'estimate' asks the planner, and 'none' skips
+        it (total and pages come back as None).
+
+        With a `search` term, `sort_by='relevance'` ranks matches by trigram
+        word similarity.
+        """
+        if count not in COUNT_MODES:
+            count = 'exact'
+
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
 
                 # --------------------------------------------
-                # 1. COUNT QUERY
+                # 1. FILTERS
                 # --------------------------------------------
-                count_query = """
-                    SELECT COUNT(*)
-                    FROM students s
-                    LEFT JOIN programs p ON s.program_code = p.program_code
-                    LEFT JOIN colleges c ON p.college_code = c.college_code
-                """
-                count_params = []
-                where_clauses = []
+                from_sql = LIST_FROM
+                where_clauses, filter_params = _list_filters(search, program_code_filter, year_filter, gender_filter)
+                where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+
+                # --------------------------------------------
+                # 2. SORTING
+                # --------------------------------------------
+                # nullable columns are coalesced so the seek predicate
+                # compares the same values the ORDER BY sees
+                sort_mapping = {
+                    'id': 's.id_number',
+                    'first_name': 's.first_name',
+                    'last_name': 's.last_name',
+                    'program': "COALESCE(p.program_name, '')",
+                    'year': "COALESCE(s.year_level, '')",
+                    'gender': "COALESCE(s.gender, '')"
+                }
 
+                # rank by how closely the term matches a word in the document,
+                # negated so every sort key ascends for the seek predicate. The
+                # term is a bound parameter of a lateral score, never part of
+                # the SQL text, so logs and statement stats don't see it.
+                rank_sql, rank_params = "", []
                 if search:
-                    where_clauses.append("""
-                        (LOWER(s.id_number) LIKE LOWER(%s)
-                        OR LOWER(s.first_name) LIKE LOWER(%s)
-                        OR LOWER(s.last_name) LIKE LOWER(%s)
-                        OR LOWER(s.program_code) LIKE LOWER(%s)
-                        OR LOWER(s.year_level::text) LIKE LOWER(%s)
-                        OR LOWER(s.gender) LIKE LOWER(%s)
-                        OR LOWER(p.program_name) LIKE LOWER(%s))
-                    """)
-                    search_term = f"%{search}%"
-                    count_params.extend([
-                        search_term, search_term, search_term,
-                        search_term, search_term, search_term,
-                        search_term
-                    ])
-
-                if program_code_filter:
-                    where_clauses.append("s.program_code = %s")
-                    count_params.append(program_code_filter)
-
-                if year_filter:
-                    where_clauses.append("s.year_level = %s")
-                    count_params.append(year_filter)
-
-                if gender_filter:
-                    where_clauses.append("s.gender = %s")
-                    count_params.append(gender_filter)
-
-                if where_clauses:
-                    count_query += " WHERE " + " AND ".join(where_clauses)
-
-                cursor.execute(count_query, count_params)
-                total = cursor.fetchone()[0]
+                    sort_mapping['relevance'] = 'score.relevance'
+
+                if sort_by not in sort_mapping:
+                    sort_by = 'id'
+                if sort_by == 'relevance':
+                    rank_sql = f" CROSS JOIN LATERAL (SELECT (-word_similarity(%s, {SEARCH_DOCUMENT}))::float8 AS relevance) score"
+                    rank_params = [search.lower()]
+                sort_column = sort_mapping[sort_by]
+                # id_number breaks ties so every row has a unique position
+                order_keys = [sort_column] if sort_by == 'id' else [sort_column, 's.id_number']
 
                 # --------------------------------------------
-                # 2. MAIN QUERY
+                # 3. PAGE QUERY (with the total folded in)
                 # --------------------------------------------
-                query = """
+                params = []
+                total_sql = ""
+                if count == 'exact':
+                    if after:
+                        # the seek predicate would shrink a window count, so
+                        # count the filtered set once as an uncorrelated subquery
+                        total_sql = f", (SELECT COUNT(*) {from_sql}{where_sql})"
+                        params.extend(filter_params)
+                    else:
+                        total_sql = ", COUNT(*) OVER ()"
+
+                query = f"""
                     SELECT s.id_number, s.first_name, s.last_name, s.program_code,
                         s.year_level, s.gender, p.program_name, c.college_name,
-                        s.date_registered, s.file_link
-                    FROM students s
-                    LEFT JOIN programs p ON s.program_code = p.program_code
-                    LEFT JOIN colleges c ON p.college_code = c.college_code
+                        s.date_registered, s.file_link, {sort_column}{total_sql}
+                    {from_sql}{rank_sql}
                 """
-                params = []
+                page_clauses = list(where_clauses)
+                params.extend(rank_params)
+                params.extend(filter_params)
 
-                if where_clauses:
-                    query += " WHERE " + " AND ".join(where_clauses)
-                    params.extend(count_params)
+                if after:
+                    seek_sql, seek_params = keyset_clause(order_keys, after, sort_by)
+                    page_clauses.append(seek_sql)
+                    params.extend(seek_params)
 
-                # --------------------------------------------
-                # 3. SORTING
-                # --------------------------------------------
-                sort_mapping = {
-                    'id': 's.id_number',
-                    'first_name': 's.first_name',
-                    'last_name': 's.last_name',
-                    'program': 'p.program_name',
-                    'year': 's.year_level',
-                    'gender': 's.gender'
-                }
+                if page_clauses:
+                    query += " WHERE " + " AND ".join(page_clauses)
 
-                sort_column = sort_mapping.get(sort_by, 's.id_number')
-                query += f" ORDER BY {sort_column}"
+                query += " ORDER BY " + ", ".join(order_keys)
 
                 # --------------------------------------------
                 # 4. PAGINATION
                 # --------------------------------------------
-                offset = (page - 1) * per_page
-                query += " LIMIT %s OFFSET %s"
-                params.extend([per_page, offset])
+                # fetch one extra row to learn whether another page exists
+                if after:
+                    query += " LIMIT %s"
+                    params.append(per_page + 1)
+                else:
+                    offset = (page - 1) * per_page
+                    query += " LIMIT %s OFFSET %s"
+                    params.extend([per_page + 1, offset])
 
                 cursor.execute(query, params)
                 rows = cursor.fetchall()
+                has_more = len(rows) > per_page
+                rows = rows[:per_page]
+
+                # --------------------------------------------
+                # 5. TOTAL
+                # --------------------------------------------
+                total = None
+                if count == 'exact':
+                    if rows:
+                        total = rows[0][11]
+                    elif page <= 1 and not after:
+                        total = 0
+                    else:
+                        # past the last page: no row carried the count
+                        cursor.execute(f"SELECT COUNT(*) {from_sql}{where_sql}", filter_params)
+                        total = cursor.fetchone()[0]
+                elif count == 'estimate':
+                    total = estimate_count(cursor, from_sql, where_sql, filter_params)
 
                 items = []
                 for r in rows:
@@ -189,23 +457,62 @@ class Students:
                         "file_link": r[9]
                     })
 
-                total_pages = (total + per_page - 1) // per_page
+                next_cursor = None
+                if has_more:
+                    last = rows[-1]
+                    next_cursor = encode_cursor(sort_by, [last[10], last[0]] if sort_by != 'id' else [last[0]])
 
                 return {
                     'items': items,
                     'total': total,
-                    'pages': total_pages,
+                    'pages': total_pages(total, per_page),
                     'page': page,
-                    'per_page': per_page
+                    'per_page': per_page,
+                    'next_cursor': next_cursor
                 }
 
-        finally:
-            db_pool.putconn(conn)
+
+    @staticmethod
+    def iter_export(search=None, program_code_filter=None, year_filter=None, gender_filter=None, batch_size=2000):
+        """Yield every student matching the list filters, ordered by ID.
+
+        Rows come through a named (server-side) cursor `batch_size` at a time,
+        so a full-registry export runs in constant memory.
+        """
+        where_clauses, params = _list_filters(search, program_code_filter, year_filter, gender_filter)
+        query = f"""
+            SELECT s.id_number, s.first_name, s.last_name, s.program_code,
+                s.year_level, s.gender, p.program_name, c.college_name,
+                s.date_registered, s.file_link
+            {LIST_FROM}
+        """
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+        query += " ORDER BY s.id_number"
+
+        with connection() as conn:
+            # named cursors live inside a transaction; it only reads, so end it with a rollback
+            with conn.cursor(name='students_export') as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                for r in cursor:
+                    yield {
+                        "id_number": r[0],
+                        "first_name": r[1],
+                        "last_name": r[2],
+                        "program_code": r[3],
+                        "year": r[4],
+                        "gender": r[5],
+                        "program_name": r[6],
+                        "college_name": r[7],
+                        "date_registered": r[8],
+                        "file_link": r[9]
+                    }
+            conn.rollback()
 
     @staticmethod
     def get_by_id(id_number):
-        conn = db_pool.getconn()
-        try:
+        with connection(readonly=True) as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
@@ -233,60 +540,63 @@ class Students:
                     "program_name": row[8],
                     "college_name": row[9]
                 }
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def update(original_id, new_id, first_name, last_name, program_code, year, gender, file_link=None, clear_picture=False):
-        conn = db_pool.getconn()
-        try:
+        """Update a student in one statement.
+
+        file_link replaces the stored link when given (or when clear_picture is
+        set); otherwise the stored link is kept. Returns {'file_link': <link
+        before the update>}, or None if there is no such student. A new ID that
+        is taken raises UniqueViolation; an unknown program ForeignKeyViolation.
+        """
+        with connection() as conn:
             with conn.cursor() as cursor:
-                if clear_picture:
-                    cursor.execute(
-                        """
-                        UPDATE students
-                        SET id_number = %s, first_name = %s, last_name = %s,
-                            program_code = %s, year_level = %s, gender = %s, file_link = %s
-                        WHERE id_number = %s
-                        """,
-                        (new_id, first_name, last_name, program_code, year, gender, file_link, original_id)
+                cursor.execute(
+                    """
+                    WITH old AS (
+                        SELECT id_number, file_link FROM students WHERE id_number = %(original_id)s FOR UPDATE
+                    )
+                    UPDATE students s
+                    SET id_number = %(new_id)s, first_name = %(first_name)s, last_name = %(last_name)s,
+                        program_code = %(program_code)s, year_level = %(year)s, gender = %(gender)s,
+                        file_link = CASE WHEN %(clear_picture)s THEN %(file_link)s
+                                         ELSE COALESCE(%(file_link)s, s.file_link) END
+                    FROM old
+                    WHERE s.id_number = old.id_number
+                    RETURNING old.file_link
+                    """,
+                    {
+                        'original_id': original_id,
+                        'new_id': new_id,
+                        'first_name': first_name,
+                        'last_name': last_name,
+                        'program_code': program_code,
+                        'year': year,
+                        'gender': gender,
+                        'file_link': file_link,
+                        'clear_picture': bool(clear_picture)
+                    }
                 )
-                else: 
-                    if file_link is not None:
-                        cursor.execute(
-                            """
-                            UPDATE students
-                            SET id_number = %s, first_name = %s, last_name = %s,
-                                program_code = %s, year_level = %s, gender = %s, file_link = %s
-                            WHERE id_number = %s
-                            """,
-                            (new_id, first_name, last_name, program_code, year, gender, file_link, original_id)
-                        )
-                    else:
-                        cursor.execute(
-                            """
-                            UPDATE students
-                            SET id_number = %s, first_name = %s, last_name = %s,
-                                program_code = %s, year_level = %s, gender = %s
-                            WHERE id_number = %s
-                            """,
-                            (new_id, first_name, last_name, program_code, year, gender, original_id)
-                        )
-                
-                updated = cursor.rowcount
+                row = cursor.fetchone()
+                conn.commit()
+                Dashboard.invalidate()
+                return {'file_link': row[0]} if row else None
+
+    @staticmethod
+    def set_file_link(id_number, file_link):
+        """Point the student's picture at file_link (None clears it)."""
+        with connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE students SET file_link = %s WHERE id_number = %s", (file_link, id_number))
                 conn.commit()
-                return updated
-        finally:
-            db_pool.putconn(conn)
 
     @staticmethod
     def delete(id_number):
-        conn = db_pool.getconn()
-        try:
+        with connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("DELETE FROM students WHERE id_number = %s", (id_number,))
                 deleted = cursor.rowcount
                 conn.commit()
-                return deleted
-        finally:
-            db_pool.putconn(conn)
\ No newline at end of file
+                Dashboard.invalidate()
+                return deleted
\ No newline at end of file
@@ -0,0 +1,290 @@
+"""Synthetic registry data for load testing.
+
+    python -m app.synthetic --students 1000000 --seed 7 --replace
+
+Generates colleges, programs, users and students with realistic, reproducible
+distributions (the same arguments always produce the same rows) and loads
+them with COPY, so 10k to 10M students load in seconds to minutes.
+"""
+import argparse
+import hashlib
+import io
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from app.db_init import get_connection
+
+COLLEGES = [
+    ('ENG', 'College of Engineering'),
+    ('SCI', 'College of Science'),
+    ('ART', 'College of Arts'),
+    ('BUS', 'College of Business'),
+    ('EDU', 'College of Education'),
+    ('NUR', 'College of Nursing'),
+    ('CCS', 'College of Computer Studies'),
+    ('AGR', 'College of Agriculture'),
+]
+
+# (code, name, college, relative size) - a few large programs and a long tail
+PROGRAMS = [
+    ('BSCE', 'Bachelor of Science in Civil Engineering', 'ENG', 9),
+    ('BSEE', 'Bachelor of Science in Electrical Engineering', 'ENG', 6),
+    ('BSME', 'Bachelor of Science in Mechanical Engineering', 'ENG', 6),
+    ('BSCHE', 'Bachelor of Science in Chemical Engineering', 'ENG', 3),
+    ('BSCPE', 'Bachelor of Science in Computer Engineering', 'ENG', 5),
+    ('BSCS', 'Bachelor of Science in Computer Science', 'CCS', 12),
+    ('BSIT', 'Bachelor of Science in Information Technology', 'CCS', 14),
+    ('BSIS', 'Bachelor of Science in Information Systems', 'CCS', 4),
+    ('BSMATH', 'Bachelor of Science in Mathematics', 'SCI', 2),
+    ('BSPHY', 'Bachelor of Science in Physics', 'SCI', 1),
+    ('BSBIO', 'Bachelor of Science in Biology', 'SCI', 7),
+    ('BSCHEM', 'Bachelor of Science in Chemistry', 'SCI', 2),
+    ('BAENG', 'Bachelor of Arts in English', 'ART', 3),
+    ('BAHIST', 'Bachelor of Arts in History', 'ART', 1),
+    ('BAART', 'Bachelor of Arts in Fine Arts', 'ART', 1),
+    ('BAPSY', 'Bachelor of Arts in Psychology', 'ART', 8),
+    ('BAPOLSCI', 'Bachelor of Arts in Political Science', 'ART', 4),
+    ('BSA', 'Bachelor of Science in Accountancy', 'BUS', 10),
+    ('BSBA', 'Bachelor of Science in Business Administration', 'BUS', 13),
+    ('BSHM', 'Bachelor of Science in Hospitality Management', 'BUS', 5),
+    ('BSED', 'Bachelor of Secondary Education', 'EDU', 6),
+    ('BEED', 'Bachelor of Elementary Education', 'EDU', 5),
+    ('BPED', 'Bachelor of Physical Education', 'EDU', 2),
+    ('BSN', 'Bachelor of Science in Nursing', 'NUR', 11),
+    ('BSMT', 'Bachelor of Science in Medical Technology', 'NUR', 3),
+    ('BSAGRI', 'Bachelor of Science in Agriculture', 'AGR', 3),
+    ('BSFOR', 'Bachelor of Science in Forestry', 'AGR', 1),
+]
+
+FIRST_NAMES = [
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+    'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen',
+    'Christopher', 'Nancy', 'Daniel', 'Lisa', 'Matthew', 'Betty', 'Anthony', 'Margaret', 'Mark', 'Sandra',
+    'Donald', 'Ashley', 'Steven', 'Kimberly', 'Paul', 'Emily', 'Andrew', 'Donna', 'Joshua', 'Michelle',
+    'Kenneth', 'Dorothy', 'Kevin', 'Carol', 'Brian', 'Amanda', 'George', 'Melissa', 'Edward', 'Deborah',
+    'Ronald', 'Stephanie', 'Timothy', 'Rebecca', 'Jason', 'Sharon', 'Jeffrey', 'Laura', 'Ryan', 'Cynthia',
+    'Jacob', 'Kathleen', 'Gary', 'Amy', 'Nicholas', 'Angela', 'Eric', 'Shirley', 'Jonathan', 'Anna',
+    'Stephen', 'Brenda', 'Larry', 'Pamela', 'Justin', 'Emma', 'Scott', 'Nicole', 'Brandon', 'Helen',
+    'Benjamin', 'Samantha', 'Samuel', 'Katherine', 'Gregory', 'Christine', 'Alexander', 'Debra', 'Frank', 'Rachel',
+    'Patrick', 'Carolyn', 'Raymond', 'Janet', 'Jack', 'Catherine', 'Dennis', 'Maria', 'Jerry', 'Heather',
+]
+
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+    'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson',
+    'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores',
+    'Green', 'Adams', 'Nelson', 'Baker', 'Hall', 'Rivera', 'Campbell', 'Mitchell', 'Carter', 'Roberts',
+    'Gomez', 'Phillips', 'Evans', 'Turner', 'Diaz', 'Parker', 'Cruz', 'Edwards', 'Collins', 'Reyes',
+    'Stewart', 'Morris', 'Morales', 'Murphy', 'Cook', 'Rogers', 'Gutierrez', 'Ortiz', 'Morgan', 'Cooper',
+    'Peterson', 'Bailey', 'Reed', 'Kelly', 'Howard', 'Ramos', 'Kim', 'Cox', 'Ward', 'Richardson',
+    'Watson', 'Brooks', 'Chavez', 'Wood', 'James', 'Bennett', 'Gray', 'Mendoza', 'Ruiz', 'Hughes',
+    'Price', 'Alvarez', 'Castillo', 'Sanders', 'Patel', 'Myers', 'Long', 'Ross', 'Foster', 'Jimenez',
+]
+
+YEAR_LEVELS = ['1st Year', '2nd Year', '3rd Year', '4th Year', '5th Year']
+GENDERS = ['Male', 'Female', 'Other']
+GENDER_WEIGHTS = [48, 49, 3]
+# share of ID numbers never used or freed by withdrawals, so next-ID gap filling has work to do
+ID_GAP_RATE = 0.02
+# share of students whose program was deleted (program_code set NULL by the FK)
+NO_PROGRAM_RATE = 0.005
+# enrolment grows this much year over year
+YEARLY_GROWTH = 1.06
+# highest generated ID suffix per enrolment year. IDs are YEAR-NNNN, as
+# StudentForm requires; the suffixes above this stay free for the app's own
+# adds. Larger registries reach back over more enrolment years instead.
+YEAR_CAPACITY = 9_900
+# password of every generated user, so load tests can log in
+USER_PASSWORD = 'loadtest'
+COPY_BATCH = 100_000
+
+
+def generate(students=10_000, users=100, seed=42, first_year=2021, last_year=2025, replace=False, conn=None):
+    """Generate and COPY a synthetic registry; returns row counts per table.
+
+    Everything is loaded in one transaction and the tables are analyzed
+    afterwards so the planner sees realistic statistics. Unless `replace` is
+    set the target tables must be empty; with it they are truncated first.
+
+    When more than YEAR_CAPACITY students per year would be needed,
+    `first_year` moves back until every ID fits YEAR-NNNN; raises ValueError
+    if even year 1000 is not early enough.
+    """
+    first_year = _first_year(students, first_year, last_year)
+    rng = random.Random(seed)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                _prepare(cur, replace)
+                _copy(cur, 'colleges (college_code, college_name)', ((c, n) for c, n in COLLEGES))
+                _copy(cur, 'programs (program_code, program_name, college_code)',
+                      ((c, n, college) for c, n, college, _ in PROGRAMS))
+                _copy(cur, 'users (username, email, user_password)', _user_rows(users))
+                _copy(
+                    cur,
+                    'students (id_number, first_name, last_name, year_level, gender, program_code, date_registered)',
+                    _student_rows(rng, students, first_year, last_year)
+                )
+                cur.execute("ANALYZE colleges, programs, users, students")
+    finally:
+        if own_conn:
+            conn.close()
+    return {'colleges': len(COLLEGES), 'programs': len(PROGRAMS), 'users': users, 'students': students}
+
+
+def _prepare(cur, replace):
+    if replace:
+        tables = ['students', 'programs', 'colleges', 'users']
+        # the reservations table only exists once migration 6 has run
+        cur.execute("SELECT to_regclass('student_id_reservations') IS NOT NULL")
+        if cur.fetchone()[0]:
+            tables.append('student_id_reservations')
+        cur.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+        return
+    cur.execute("""
+    SELECT EXISTS (SELECT 1 FROM colleges) OR EXISTS (SELECT 1 FROM programs)
+        OR EXISTS (SELECT 1 FROM students) OR EXISTS (SELECT 1 FROM users)
+    """)
+    if cur.fetchone()[0]:
+        raise ValueError('Tables already hold data; pass --replace to truncate them first.')
+
+
+def _copy(cur, target, rows):
+    """COPY rows into `target` in batches of COPY_BATCH, keeping memory flat."""
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write('\t'.join(r'\N' if value is None else str(value) for value in row))
+        buffer.write('\n')
+        count += 1
+        if count % COPY_BATCH == 0:
+            buffer.seek(0)
+            cur.copy_expert(f"COPY {target} FROM STDIN", buffer)
+            buffer = io.StringIO()
+    if buffer.tell():
+        buffer.seek(0)
+        cur.copy_expert(f"COPY {target} FROM STDIN", buffer)
+
+
+def _user_rows(count):
+    # passwords are stored as MD5 hex, matching Users.add
+    password_hash = hashlib.md5(USER_PASSWORD.encode()).hexdigest()
+    for i in range(1, count + 1):
+        yield f'user{i:06d}', f'user{i:06d}@example.com', password_hash
+
+
+def _first_year(total, first_year, last_year):
+    """The earliest enrolment year needed to keep every year within YEAR_CAPACITY."""
+    first_year = min(first_year, last_year + 1 - math.ceil(total / YEAR_CAPACITY))
+    if first_year < 1000:
+        raise ValueError(f'{total} students do not fit four-digit years ending {last_year} '
+                         f'at {YEAR_CAPACITY} per year.')
+    return first_year
+
+
+def _year_counts(total, first_year, last_year):
+    """Students per enrolment year, growing by YEARLY_GROWTH and capped at YEAR_CAPACITY.
+
+    Years are filled newest first, each taking its weighted share of what is
+    left; a capped year's excess falls to the earlier ones.
+    """
+    years = list(range(first_year, last_year + 1))
+    weights = [YEARLY_GROWTH ** i for i in range(len(years))]
+    # weight of each year and all before it, summed oldest first to stay exact
+    weight_upto = _cumulative(weights)
+    counts = [0] * len(years)
+    remaining = total
+    for i in reversed(range(len(years))):
+        share = remaining if i == 0 else round(remaining * weights[i] / weight_upto[i])
+        counts[i] = min(YEAR_CAPACITY, share)
+        remaining -= counts[i]
+    return zip(years, counts)
+
+
+def _student_rows(rng, total, first_year, last_year):
+    """Yield student rows, enrolment year by enrolment year.
+
+    IDs run YEAR-0001 upwards with occasional gaps, skipped only while the
+    year's last ID still fits in YEAR_CAPACITY, so every ID is a valid
+    YEAR-NNNN. Year level
+    follows time since enrolment with some students held back, and
+    date_registered falls mostly in the June-August enrolment window.
+    """
+    program_codes = [p[0] for p in PROGRAMS]
+    program_weights = _cumulative([p[3] for p in PROGRAMS])
+    # Zipf-like name popularity: a handful of very common names and a long tail
+    first_weights = _cumulative([1 / (i + 1) for i in range(len(FIRST_NAMES))])
+    last_weights = _cumulative([1 / (i + 1) for i in range(len(LAST_NAMES))])
+    gender_weights = _cumulative(GENDER_WEIGHTS)
+
+    for year, count in _year_counts(total, first_year, last_year):
+        season_start = datetime(year, 6, 1)
+        suffix = 0
+        # draw the categorical columns a chunk at a time; per-row choices() calls dominate otherwise
+        for chunk_start in range(0, count, 10_000):
+            size = min(10_000, count - chunk_start)
+            first_names = rng.choices(FIRST_NAMES, cum_weights=first_weights, k=size)
+            last_names = rng.choices(LAST_NAMES, cum_weights=last_weights, k=size)
+            genders = rng.choices(GENDERS, cum_weights=gender_weights, k=size)
+            programs = rng.choices(program_codes, cum_weights=program_weights, k=size)
+            for i in range(size):
+                left = count - chunk_start - i  # this row and the rest of the year
+                suffix += 2 if rng.random() < ID_GAP_RATE and suffix + 1 + left <= YEAR_CAPACITY else 1
+                held_back = 1 if rng.random() < 0.1 else 0
+                level = min(max(last_year - year + 1 - held_back, 1), len(YEAR_LEVELS))
+                if rng.random() < 0.85:
+                    registered = season_start + timedelta(seconds=rng.randrange(92 * 86400))
+                else:
+                    registered = datetime(year, 1, 1) + timedelta(seconds=rng.randrange(365 * 86400))
+                yield (
+                    f'{year}-{suffix:04d}',
+                    first_names[i],
+                    last_names[i],
+                    YEAR_LEVELS[level - 1],
+                    genders[i],
+                    None if rng.random() < NO_PROGRAM_RATE else programs[i],
+                    registered.isoformat(sep=' ')
+                )
+
+
+def _cumulative(weights):
+    total = 0
+    out = []
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load a synthetic student registry for load testing.')
+    parser.add_argument('--students', type=int, default=10_000, help='number of students (10k to 10M)')
+    parser.add_argument('--users', type=int, default=100, help=f'number of users (password: {USER_PASSWORD})')
+    parser.add_argument('--seed', type=int, default=42, help='random seed; same seed, same data')
+    parser.add_argument('--first-year', type=int, default=2021, help='earliest enrolment year (earlier if needed to keep IDs four digits); older cohorts all count as 5th year')
+    parser.add_argument('--last-year', type=int, default=2025)
+    parser.add_argument('--replace', action='store_true', help='truncate existing registry data first')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        counts = generate(
+            students=args.students,
+            users=args.users,
+            seed=args.seed,
+            first_year=args.first_year,
+            last_year=args.last_year,
+            replace=args.replace
+        )
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    print(', '.join(f"{n} {table}" for table, n in counts.items()) + f" loaded in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@ from app.user.forms import RegistrationForm, LoginForm, SettingsForm
 from app import csrf
 from config import SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_BUCKET_NAME
 from supabase import create_client, Client
+from app.metrics import timed_bucket
 
 
 supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
@@ -54,13 +55,13 @@ def register():
             try:
                 file_bytes = file.read()
                 content_type = file.mimetype
-                upload_response = supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
+                upload_response = timed_bucket(supabase, SUPABASE_BUCKET_NAME).upload(
                     path=file_path,
                     file=file_bytes,
                     file_options={"content-type": content_type}
                 )
                 # Get public URL
-                profile_picture_url = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(file_path)
+                profile_picture_url = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(file_path)
             except Exception as upload_error:
                 flash(f'File upload failed: {str(upload_error)}', 'danger')
                 return redirect(url_for('.register'))
@@ -76,9 +77,9 @@ def register():
                     user_id = user_data['id']
                     new_file_path = f"users/{user_id}.{file_extension}"
                     # Move file to proper path
-                    supabase.storage.from_(SUPABASE_BUCKET_NAME).move(file_path, new_file_path)
+                    timed_bucket(supabase, SUPABASE_BUCKET_NAME).move(file_path, new_file_path)
                     # Update URL
-                    profile_picture_url = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(new_file_path)
+                    profile_picture_url = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(new_file_path)
                     # Update user record
                     Users.update_user(user_id, {'username': form.username.data, 'email': form.email.data, 'profile_picture': profile_picture_url})
             except Exception as e:
@@ -131,7 +132,7 @@ def settings():
                     # Try to delete possible extensions
                     for ext in ['png', 'jpg', 'jpeg', 'gif']:
                         try:
-                            supabase.storage.from_(SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{ext}"])
+                            timed_bucket(supabase, SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{ext}"])
                         except:
                             pass  # File might not exist with this extension
             except Exception as e:
@@ -153,19 +154,19 @@ def settings():
             try:
                 # Delete old file if exists
                 try:
-                    supabase.storage.from_(SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{file_extension}"])
+                    timed_bucket(supabase, SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{file_extension}"])
                 except:
                     pass  # Old file might not exist or different extension
 
                 file_bytes = file.read()
                 content_type = file.mimetype
-                upload_response = supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
+                upload_response = timed_bucket(supabase, SUPABASE_BUCKET_NAME).upload(
                     path=file_path,
                     file=file_bytes,
                     file_options={"content-type": content_type}
                 )
                 # Get public URL
-                profile_picture_url = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(file_path)
+                profile_picture_url = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(file_path)
             except Exception as upload_error:
                 flash(f'File upload failed: {str(upload_error)}', 'danger')
                 return redirect(url_for('.settings'))
@@ -309,13 +310,13 @@ def api_register():
                 try:
                     file_bytes = file.read()
                     content_type = file.mimetype
-                    upload_response = supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
+                    upload_response = timed_bucket(supabase, SUPABASE_BUCKET_NAME).upload(
                         path=file_path,
                         file=file_bytes,
                         file_options={"content-type": content_type}
                     )
                     # Get public URL
-                    profile_picture_url = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(file_path)
+                    profile_picture_url = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(file_path)
                 except Exception as upload_error:
                     return jsonify({'success': False, 'error': f'File upload failed: {str(upload_error)}'}), 500
 
@@ -331,9 +332,9 @@ def api_register():
                     user_id = user_data['id']
                     new_file_path = f"users/{user_id}.{file_extension}"
                     # Move file to proper path
-                    supabase.storage.from_(SUPABASE_BUCKET_NAME).move(file_path, new_file_path)
+                    timed_bucket(supabase, SUPABASE_BUCKET_NAME).move(file_path, new_file_path)
                     # Update URL
-                    profile_picture_url = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(new_file_path)
+                    profile_picture_url = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(new_file_path)
                     # Update user record
                     Users.update_user(user_id, {'username': username, 'email': email, 'profile_picture': profile_picture_url})
             except Exception as e:
@@ -421,7 +422,7 @@ def api_update_profile():
                     # Try to delete possible extensions
                     for ext in ['png', 'jpg', 'jpeg', 'gif']:
                         try:
-                            supabase.storage.from_(SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{ext}"])
+                            timed_bucket(supabase, SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{ext}"])
                         except:
                             pass  # File might not exist with this extension
             except Exception as e:
@@ -441,19 +442,19 @@ def api_update_profile():
             try:
                 # Delete old file if exists
                 try:
-                    supabase.storage.from_(SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{file_extension}"])
+                    timed_bucket(supabase, SUPABASE_BUCKET_NAME).remove([f"users/{user_id}.{file_extension}"])
                 except:
                     pass  # Old file might not exist or different extension
 
                 file_bytes = profile_picture.read()
                 content_type = profile_picture.mimetype
-                upload_response = supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
+                upload_response = timed_bucket(supabase, SUPABASE_BUCKET_NAME).upload(
                     path=file_path,
                     file=file_bytes,
                     file_options={"content-type": content_type}
                 )
                 # Get public URL
-                profile_picture_url = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(file_path)
+                profile_picture_url = timed_bucket(supabase, SUPABASE_BUCKET_NAME).get_public_url(file_path)
             except Exception as upload_error:
                 return jsonify({'success': False, 'error': f'File upload failed: {str(upload_error)}'}), 500
 
@@ -0,0 +1,56 @@
+"""Diff two benchmark result files.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Prints p50/p95/queries-per-request side by side for every size and scenario
+present in both files and flags p95 regressions above the threshold percent.
+Exits non-zero if any scenario regressed, so it can gate CI.
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report['meta'], {run['students']: run['scenarios'] for run in report['runs']}
+
+
+def change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files.')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help='p95 regression percent that fails the run')
+    args = parser.parse_args()
+
+    before_meta, before = load(args.before)
+    after_meta, after = load(args.after)
+    print(f"{before_meta.get('commit')} -> {after_meta.get('commit')}")
+
+    regressions = 0
+    for students in sorted(set(before) & set(after)):
+        print(f"\n{students} students")
+        print(f"  {'scenario':<22} {'p50 ms':>19} {'p95 ms':>19} {'queries':>13}")
+        for name in before[students]:
+            if name not in after[students]:
+                continue
+            b, a = before[students][name], after[students][name]
+            p95_change = change(b['p95_ms'], a['p95_ms'])
+            flag = ''
+            if p95_change is not None and p95_change > args.threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(f"  {name:<22} {b['p50_ms']:>9} {a['p50_ms']:>9} {b['p95_ms']:>9} {a['p95_ms']:>9} "
+                  f"{b['queries_per_request']:>6} {a['queries_per_request']:>6}"
+                  f"{'' if p95_change is None else f'  p95 {p95_change:+.1f}%'}{flag}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
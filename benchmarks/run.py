@@ -0,0 +1,154 @@
+"""HTTP benchmark suite for the REST endpoints.
+
+    python -m benchmarks.run --sizes 10000,100000,1000000 --requests 200 --output results.json
+
+For each size the local database is reseeded with app.synthetic (this
+TRUNCATES the registry tables, so never point it at real data), then every
+scenario in benchmarks.scenarios is driven through the Flask test client.
+Reports p50/p95/p99 latency, requests/s and queries per request, and writes
+everything as JSON for benchmarks.compare.
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from app import create_app, db, db_init, synthetic
+from .scenarios import SCENARIOS, WRITE_SCENARIOS, PER_PAGE, MAX_CREATES, prepare_writes
+
+QUERY_HEADER = 'X-Bench-Queries'
+
+
+def build_app():
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    @app.after_request
+    def report_queries(response):
+        response.headers[QUERY_HEADER] = str(db.query_count())
+        return response
+
+    return app
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(client, state, scenario, requests, warmup):
+    for i in range(warmup):
+        scenario(client, state, i)
+    timings, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for i in range(warmup, warmup + requests):
+        t0 = time.perf_counter()
+        response = scenario(client, state, i)
+        elapsed = time.perf_counter() - t0
+        if response is None:
+            continue
+        timings.append(elapsed)
+        queries.append(int(response.headers.get(QUERY_HEADER, 0)))
+        if response.status_code >= 400:
+            errors += 1
+    total = time.perf_counter() - started
+    timings.sort()
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'p50_ms': ms(percentile(timings, 50)),
+        'p95_ms': ms(percentile(timings, 95)),
+        'p99_ms': ms(percentile(timings, 99)),
+        'mean_ms': ms(sum(timings) / len(timings)) if timings else None,
+        'requests_per_second': round(len(timings) / total, 2) if total else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_size(app, students, args):
+    if students is not None:
+        started = time.perf_counter()
+        synthetic.generate(students=students, users=args.users, seed=args.seed, replace=True)
+        print(f"Seeded {students} students in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    client = app.test_client()
+    state = {'username': 'user000001'}
+    response = client.post('/api/login', json={'username': state['username'], 'password': synthetic.USER_PASSWORD})
+    if response.status_code != 200:
+        raise SystemExit(f"Benchmark login failed ({response.status_code}); seed the database first.")
+    total = client.get('/api/students?per_page=1').get_json()['data']['total'] or 0
+    state['last_page'] = max(1, total // PER_PAGE)
+    if not args.only or args.only & WRITE_SCENARIOS:
+        prepare_writes(client, state)
+
+    results = {}
+    for name, scenario in SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        results[name] = run_scenario(client, state, scenario, args.requests, args.warmup)
+        r = results[name]
+        # !s: a scenario with nothing left to do reports None
+        print(f"  {name:<22} p50 {r['p50_ms']!s:>9}ms  p95 {r['p95_ms']!s:>9}ms  p99 {r['p99_ms']!s:>9}ms  "
+              f"{r['requests_per_second']!s:>8} req/s  {r['queries_per_request']!s:>5} q/req  {r['errors']} errors",
+              file=sys.stderr)
+    return {'students': total, 'scenarios': results}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the REST endpoints against a local database.')
+    parser.add_argument('--sizes', default='10000,100000',
+                        help='comma separated student counts to seed and test; "current" keeps the existing data')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per scenario')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', type=lambda v: set(v.split(',')), help='comma separated scenario names')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+    # student_create makes one ID per request, plus one seeded by prepare_writes
+    if args.requests + args.warmup >= MAX_CREATES:
+        parser.error(f'--requests plus --warmup must stay below {MAX_CREATES}')
+
+    db_init.initialize_db()
+    app = build_app()
+    runs = []
+    for size in args.sizes.split(','):
+        students = None if size == 'current' else int(size)
+        print(f"Running at {size} students", file=sys.stderr)
+        runs.append(run_size(app, students, args))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
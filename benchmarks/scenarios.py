@@ -0,0 +1,144 @@
+"""Request scenarios for the benchmark suite.
+
+Each scenario is a function `(client, state, i) -> response` that issues one
+request through the Flask test client. `state` is a dict shared across a run
+(the logged-in user, cursors to follow, the students the write scenarios work
+on); `i` is the iteration number, used to vary the request deterministically.
+"""
+from app.synthetic import PROGRAMS, USER_PASSWORD
+
+PER_PAGE = 20
+SEARCH_TERMS = ['smith', 'john', 'mar', '2024-00', 'bsit', 'garcia lee', 'engineering', 'zzz']
+# write scenarios create IDs under the highest year nobody holds an ID in yet,
+# searched downwards from here, so reruns against the same data never collide
+WRITE_YEAR_MAX = 9999
+# IDs are YEAR-NNNN, so one run can create at most this many students
+MAX_CREATES = 9999
+
+
+def students_first_page(client, state, i):
+    return client.get(f'/api/students?page=1&per_page={PER_PAGE}')
+
+
+def students_deep_page(client, state, i):
+    # OFFSET paging spread over the whole table
+    page = 1 + (i * 7919) % state['last_page']
+    return client.get(f'/api/students?page={page}&per_page={PER_PAGE}')
+
+
+def students_keyset(client, state, i):
+    # follow next_cursor from the first page, starting over at the end
+    after = state.get('after')
+    url = f'/api/students?per_page={PER_PAGE}&count=none'
+    response = client.get(url + (f'&after={after}' if after else ''))
+    state['after'] = (response.get_json() or {}).get('data', {}).get('next_cursor')
+    return response
+
+
+def students_search(client, state, i):
+    return client.get(f'/api/students?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}&per_page={PER_PAGE}')
+
+
+def students_filter(client, state, i):
+    program = PROGRAMS[i % len(PROGRAMS)][0]
+    gender = ['Male', 'Female', 'Other'][i % 3]
+    return client.get(f'/api/students?program_code={program}&gender={gender}&sort=last_name&per_page={PER_PAGE}')
+
+
+def students_next_id(client, state, i):
+    return client.get('/api/students/next-id/2025')
+
+
+def programs_list(client, state, i):
+    return client.get(f'/api/programs?page=1&per_page={PER_PAGE}')
+
+
+def colleges_list(client, state, i):
+    return client.get(f'/api/colleges?page=1&per_page={PER_PAGE}')
+
+
+def dashboard(client, state, i):
+    return client.get('/dashboard')
+
+
+def login(client, state, i):
+    return client.post('/api/login', json={'username': state['username'], 'password': USER_PASSWORD})
+
+
+def prepare_writes(client, state):
+    """Pick this run's ID year and pick up students earlier runs left behind.
+
+    Called once per run, before any scenario, so update and delete have rows
+    to work on even when run without student_create (--only). On a registry
+    with no benchmark students at all one is created here, unmeasured.
+    """
+    for year in range(WRITE_YEAR_MAX, 999, -1):
+        response = client.get(f'/api/students?q={year}-&per_page=1&sort=id')
+        if response.get_json()['data']['total'] == 0:
+            break
+    state['write_year'] = year
+    state['creates'] = 0
+
+    response = client.get('/api/students?q=bench&sort=id&per_page=100&count=none')
+    state['created'] = [
+        s['id_number'] for s in response.get_json()['data']['items']
+        if s['first_name'] == 'Bench' and s['last_name'].startswith('Mark')
+    ]
+    if not state['created']:
+        student_create(client, state, 0)
+
+
+def student_create(client, state, i):
+    state['creates'] += 1
+    id_number = f"{state['write_year']}-{state['creates']:04d}"
+    response = client.post('/api/students', json={
+        'id_number': id_number,
+        'first_name': 'Bench',
+        'last_name': 'Mark',
+        'program_code': PROGRAMS[i % len(PROGRAMS)][0],
+        'year': '1st Year',
+        'gender': 'Other'
+    })
+    if response.status_code < 400:
+        state['created'].append(id_number)
+    return response
+
+
+def student_update(client, state, i):
+    if not state['created']:
+        return None
+    id_number = state['created'][i % len(state['created'])]
+    return client.put(f'/api/students/{id_number}', json={
+        'first_name': 'Bench',
+        'last_name': f'Mark{i}',
+        'program_code': PROGRAMS[(i + 1) % len(PROGRAMS)][0],
+        'year': '2nd Year',
+        'gender': 'Other'
+    })
+
+
+def student_delete(client, state, i):
+    if not state['created']:
+        return None
+    return client.delete(f"/api/students/{state['created'].pop()}")
+
+
+# scenarios that need prepare_writes() first
+WRITE_SCENARIOS = {'student_create', 'student_update', 'student_delete'}
+
+# run order matters for the writes: create, then update, then delete what was created
+SCENARIOS = [
+    ('students_first_page', students_first_page),
+    ('students_deep_page', students_deep_page),
+    ('students_keyset', students_keyset),
+    ('students_search', students_search),
+    ('students_filter', students_filter),
+    ('students_next_id', students_next_id),
+    ('programs_list', programs_list),
+    ('colleges_list', colleges_list),
+    ('dashboard', dashboard),
+    ('login', login),
+    ('student_create', student_create),
+    ('student_update', student_update),
+    ('student_delete', student_delete),
+]
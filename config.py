@@ -6,6 +6,21 @@ DB_USERNAME = getenv("DB_USERNAME")
 DB_PASSWORD = getenv("DB_PASSWORD")
 DB_HOST = getenv("DB_HOST")
 DB_PORT = getenv("DB_PORT")
+DB_POOL_MIN = int(getenv("DB_POOL_MIN", "1"))  # connections kept open while idle
+DB_POOL_MAX = int(getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+STUDENT_ID_RESERVATION_MINUTES = int(getenv("STUDENT_ID_RESERVATION_MINUTES", "15"))  # how long a handed-out student ID is held
+REQUEST_LOG = getenv("REQUEST_LOG", "true").lower() == "true"  # one JSON log line per request with its DB time
+SLOW_QUERY_MS = float(getenv("SLOW_QUERY_MS", "200"))  # statements at least this slow are logged; -1 disables
+SLOW_QUERY_LOG = getenv("SLOW_QUERY_LOG", "logs/slow_queries.log")  # rotating JSON-lines file; empty keeps the in-memory summary only
+SLOW_QUERY_EXPLAIN = getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"  # capture EXPLAIN (ANALYZE, BUFFERS) for slow SELECTs
+METRICS_DIR = getenv("METRICS_DIR", "")  # shared directory for per-worker metric snapshots; clear it on deploy
+METRICS_FLUSH_SECONDS = float(getenv("METRICS_FLUSH_SECONDS", "1"))  # how often each worker writes its snapshot
+METRICS_TOKEN = getenv("METRICS_TOKEN", "")  # when set, /metrics requires "Authorization: Bearer <token>"
+DASHBOARD_CACHE_SECONDS = float(getenv("DASHBOARD_CACHE_SECONDS", "30"))  # how long a worker reuses the dashboard summary
+REFERENCE_CACHE_SECONDS = float(getenv("REFERENCE_CACHE_SECONDS", "60"))  # how long a worker reuses programs/colleges/year levels
+DASHBOARD_STREAM_MAX_CLIENTS = int(getenv("DASHBOARD_STREAM_MAX_CLIENTS", "200"))  # live dashboards per worker; each holds a worker thread
+DASHBOARD_STREAM_KEEPALIVE_SECONDS = float(getenv("DASHBOARD_STREAM_KEEPALIVE_SECONDS", "15"))  # idle comment so proxies keep the stream open
 BOOTSTRAP_SERVE_LOCAL = getenv("BOOTSTRAP_SERVE_LOCAL")
 SUPABASE_URL = getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = getenv("SUPABASE_ANON_KEY")